@@ -0,0 +1,320 @@
+import functools
+import glob
+import os
+import numpy as np
+import pandas as pd
+from geodesy import haversine_km
+
+
+KM_PER_DEGREE = 111.195  # Length of one degree of latitude in kilometers
+
+# Fixed-width record layout for the airport database (no Python objects, so it can be memory-mapped)
+AIRPORT_DTYPE = np.dtype([
+    ('ident', 'U8'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('elevation', 'f4'),  # Feet MSL
+    ('type', 'U16'),
+    ('name', 'U48'),
+    ('region', 'U8'),
+])
+
+# Column names accepted from OurAirports (airports.csv), FAA-style exports and our own airport lists
+AIRPORT_CSV_COLUMNS = {
+    'ident': ['ident', 'ID', 'LocId', 'icao_code', 'gps_code'],
+    'latitude': ['latitude_deg', 'Latitude', 'LATITUDE', 'lat'],
+    'longitude': ['longitude_deg', 'Longitude', 'LONGITUDE', 'lon'],
+    'elevation': ['elevation_ft', 'Elevation', 'ELEVATION', 'elev'],
+    'type': ['type', 'Type', 'SiteType', 'TYPE_CODE'],
+    'name': ['name', 'Site', 'FacilityName', 'NAME'],
+    'region': ['iso_region', 'State', 'STATE'],
+}
+
+# Airport types that take part in landing and low pass detection: the OurAirports land airports and the FAA
+# site type for airports (heliports, seaplane bases, balloonports and closed fields are left out)
+LANDING_AIRPORT_TYPES = ('small_airport', 'medium_airport', 'large_airport', 'AIRPORT', 'A')
+
+# List of airports in Alabama, USA
+ALABAMA_AIRPORTS = [
+    {'ID': 'CRTA1', 'State': 'AL', 'Site': 'Cedar Point', 'Latitude': 30.308, 'Longitude': -88.14, 'Elevation': 20},
+    {'ID': 'DPIA1', 'State': 'AL', 'Site': 'Dauphin Island', 'Latitude': 30.248, 'Longitude': -88.073, 'Elevation': 0},
+    {'ID': 'FMOA1', 'State': 'AL', 'Site': 'Fort Morgan', 'Latitude': 30.228, 'Longitude': -88.025, 'Elevation': 0},
+    {'ID': 'K0J4', 'State': 'AL', 'Site': 'Florala Muni', 'Latitude': 31.0447, 'Longitude': -86.3119, 'Elevation': 315},
+    {'ID': 'K0J6', 'State': 'AL', 'Site': 'Headland Muni', 'Latitude': 31.3651, 'Longitude': -85.3112, 'Elevation': 358},
+    {'ID': 'K11A', 'State': 'AL', 'Site': 'Clayton Muni', 'Latitude': 31.8815, 'Longitude': -85.4804, 'Elevation': 433},
+    {'ID': 'K1A9', 'State': 'AL', 'Site': 'Prattville Arpt', 'Latitude': 32.4374, 'Longitude': -86.5098, 'Elevation': 213},
+    {'ID': 'K1M4', 'State': 'AL', 'Site': 'Haleyville/Posey Fld', 'Latitude': 34.2832, 'Longitude': -87.5986, 'Elevation': 928},
+    {'ID': 'K1R8', 'State': 'AL', 'Site': 'Bay Minette Muni', 'Latitude': 30.8691, 'Longitude': -87.8184, 'Elevation': 249},
+    {'ID': 'K3A1', 'State': 'AL', 'Site': 'Cullman/Folsom Fld', 'Latitude': 34.268, 'Longitude': -86.858, 'Elevation': 965},
+    {'ID': 'K4A6', 'State': 'AL', 'Site': 'Scottsboro Muni', 'Latitude': 34.688, 'Longitude': -86.006, 'Elevation': 627},
+    {'ID': 'K4A9', 'State': 'AL', 'Site': 'Fort Payne/Isbell Fld', 'Latitude': 34.4759, 'Longitude': -85.717, 'Elevation': 896},
+    {'ID': 'K79J', 'State': 'AL', 'Site': 'Andalusia/Benton Fld', 'Latitude': 31.3061, 'Longitude': -86.3902, 'Elevation': 305},
+    {'ID': 'K8A0', 'State': 'AL', 'Site': 'Albertville Muni', 'Latitude': 34.2316, 'Longitude': -86.2481, 'Elevation': 1027},
+    {'ID': 'K9A4', 'State': 'AL', 'Site': 'Courtland(AAF)', 'Latitude': 34.66, 'Longitude': -87.349, 'Elevation': 577},
+    {'ID': 'KA08', 'State': 'AL', 'Site': 'Marion/Vaiden Fld', 'Latitude': 32.5167, 'Longitude': -87.3853, 'Elevation': 210},
+    {'ID': 'KAIV', 'State': 'AL', 'Site': 'Aliceville/Downer Arpt', 'Latitude': 33.108, 'Longitude': -88.192, 'Elevation': 151},
+    {'ID': 'KALX', 'State': 'AL', 'Site': 'Alexander City/Russell Fld', 'Latitude': 32.916, 'Longitude': -85.964, 'Elevation': 650},
+    {'ID': 'KANB', 'State': 'AL', 'Site': 'Anniston Metro', 'Latitude': 33.5904, 'Longitude': -85.8479, 'Elevation': 614},
+    {'ID': 'KASN', 'State': 'AL', 'Site': 'Talladega Muni', 'Latitude': 33.569, 'Longitude': -86.0519, 'Elevation': 522},
+    {'ID': 'KATA1', 'State': 'AL', 'Site': 'Katrina Cut', 'Latitude': 30.258, 'Longitude': -88.213, 'Elevation': 13},
+    {'ID': 'KAUO', 'State': 'AL', 'Site': 'Auburn Univ Arpt', 'Latitude': 32.617, 'Longitude': -85.4342, 'Elevation': 758},
+    {'ID': 'KBFM', 'State': 'AL', 'Site': 'Mobile/Downtown Arpt', 'Latitude': 30.6147, 'Longitude': -88.063, 'Elevation': 23},
+    {'ID': 'KBHM', 'State': 'AL', 'Site': 'Birmingham Intl', 'Latitude': 33.5655, 'Longitude': -86.7449, 'Elevation': 627},
+    {'ID': 'KCKL', 'State': 'AL', 'Site': 'Centreville/Bib', 'Latitude': 32.9, 'Longitude': -87.25, 'Elevation': 459},
+    {'ID': 'KCMD', 'State': 'AL', 'Site': 'Culman Rgnl', 'Latitude': 34.2722, 'Longitude': -86.8583, 'Elevation': 965},
+    {'ID': 'KCQF', 'State': 'AL', 'Site': 'Fairhope/Callahan Arpt', 'Latitude': 30.4618, 'Longitude': -87.8749, 'Elevation': 69},
+    {'ID': 'KDCU', 'State': 'AL', 'Site': 'Decatur/Pryor Fld', 'Latitude': 34.658, 'Longitude': -86.9434, 'Elevation': 591},
+    {'ID': 'KDHN', 'State': 'AL', 'Site': 'Dothan Rgnl', 'Latitude': 31.3177, 'Longitude': -85.4432, 'Elevation': 371},
+    {'ID': 'KDYA', 'State': 'AL', 'Site': 'Demopolis Muni', 'Latitude': 32.4641, 'Longitude': -87.9504, 'Elevation': 108},
+    {'ID': 'KEDN', 'State': 'AL', 'Site': 'Enterprise Muni', 'Latitude': 31.299, 'Longitude': -85.9, 'Elevation': 338},
+    {'ID': 'KEET', 'State': 'AL', 'Site': 'Alabaster/Shelby Cnty', 'Latitude': 33.1783, 'Longitude': -86.7818, 'Elevation': 564},
+    {'ID': 'KEKY', 'State': 'AL', 'Site': 'Bessemer Arpt', 'Latitude': 33.314, 'Longitude': -86.925, 'Elevation': 699},
+    {'ID': 'KEUF', 'State': 'AL', 'Site': 'Eufaula/Weedon Fld', 'Latitude': 31.9516, 'Longitude': -85.1312, 'Elevation': 285},
+    {'ID': 'KGAD', 'State': 'AL', 'Site': 'Gadsden/NE Alabama Rgnl', 'Latitude': 33.9686, 'Longitude': -86.0917, 'Elevation': 554},
+    {'ID': 'KGZH', 'State': 'AL', 'Site': 'Evergreen/Middleton Fld', 'Latitude': 31.4191, 'Longitude': -87.0484, 'Elevation': 253},
+    {'ID': 'KHAB', 'State': 'AL', 'Site': 'Hamilton/Marion Cnty', 'Latitude': 34.117, 'Longitude': -87.998, 'Elevation': 413},
+    {'ID': 'KHDL', 'State': 'AL', 'Site': 'Headland Muni', 'Latitude': 31.3641, 'Longitude': -85.3112, 'Elevation': 358},
+    {'ID': 'KHEY', 'State': 'AL', 'Site': 'Hanchey(AHP)', 'Latitude': 31.348, 'Longitude': -85.655, 'Elevation': 312},
+    {'ID': 'KHSV', 'State': 'AL', 'Site': 'Huntsville Intl', 'Latitude': 34.6441, 'Longitude': -86.7861, 'Elevation': 623},  
+    {'ID': 'KHUA', 'State': 'AL', 'Site': 'Huntsville/Redstone AAF', 'Latitude': 34.676, 'Longitude': -86.6854, 'Elevation': 656},
+    {'ID': 'KJFX', 'State': 'AL', 'Site': 'Jasper/Walker Cnty', 'Latitude': 33.9008, 'Longitude': -87.3092, 'Elevation': 472},
+    {'ID': 'KJKA', 'State': 'AL', 'Site': 'Gulf Shores/Edwards Arpt', 'Latitude': 30.291, 'Longitude': -87.661, 'Elevation': 16},
+    {'ID': 'KLOR', 'State': 'AL', 'Site': 'Ft Rucker/Lowe(AHP)', 'Latitude': 31.36, 'Longitude': -85.749, 'Elevation': 302},
+    {'ID': 'KMDQ', 'State': 'AL', 'Site': 'Huntsville/Sharp Fld', 'Latitude': 34.866, 'Longitude': -86.559, 'Elevation': 725},
+    {'ID': 'KMGM', 'State': 'AL', 'Site': 'Montgomery Rgnl', 'Latitude': 32.2997, 'Longitude': -86.4074, 'Elevation': 210},
+    {'ID': 'KMOB', 'State': 'AL', 'Site': 'Mobile Rgnl', 'Latitude': 30.6882, 'Longitude': -88.2459, 'Elevation': 220},
+    {'ID': 'KMSL', 'State': 'AL', 'Site': 'Muscle Shoals/NW Alabama Rgnl', 'Latitude': 34.7439, 'Longitude': -87.5997, 'Elevation': 558},
+    {'ID': 'KMVC', 'State': 'AL', 'Site': 'Monroeville/Monroe Cnty', 'Latitude': 31.458, 'Longitude': -87.351, 'Elevation': 420},
+    {'ID': 'KMXF', 'State': 'AL', 'Site': 'Maxwell AFB', 'Latitude': 32.3877, 'Longitude': -86.3724, 'Elevation': 154},
+    {'ID': 'KNBJ', 'State': 'AL', 'Site': 'Barin Fld(NAS)', 'Latitude': 30.391, 'Longitude': -87.633, 'Elevation': 49},
+    {'ID': 'KOZR', 'State': 'AL', 'Site': 'Ozark/Cairns AAF', 'Latitude': 31.2767, 'Longitude': -85.7105, 'Elevation': 295},
+    {'ID': 'KPLR', 'State': 'AL', 'Site': 'Pell City/St Clair Cnty', 'Latitude': 33.5608, 'Longitude': -86.2463, 'Elevation': 476},
+    {'ID': 'KPRN', 'State': 'AL', 'Site': 'Greenville/Crenshaw Mem', 'Latitude': 31.8467, 'Longitude': -86.6141, 'Elevation': 449},
+    {'ID': 'KSCD', 'State': 'AL', 'Site': 'Sylacauga Muni', 'Latitude': 33.1732, 'Longitude': -86.2933, 'Elevation': 538},
+    {'ID': 'KSEM', 'State': 'AL', 'Site': 'Selma/Craig Fld', 'Latitude': 32.3367, 'Longitude': -86.9836, 'Elevation': 157},
+    {'ID': 'KSXS', 'State': 'AL', 'Site': 'Schell AFP', 'Latitude': 31.364, 'Longitude': -85.846, 'Elevation': 394},
+    {'ID': 'KTCL', 'State': 'AL', 'Site': 'Tuscaloosa Rgnl', 'Latitude': 33.2122, 'Longitude': -87.6155, 'Elevation': 157},
+    {'ID': 'KTOI', 'State': 'AL', 'Site': 'Troy Muni', 'Latitude': 31.8574, 'Longitude': -86.0103, 'Elevation': 394},
+    {'ID': 'KVOA', 'State': 'AL', 'Site': 'Viosca Knoll 786A', 'Latitude': 29.2289, 'Longitude': -87.7808, 'Elevation': 174},
+    {'ID': 'MBLA1', 'State': 'AL', 'Site': 'Middle Bay Light', 'Latitude': 30.437, 'Longitude': -88.012, 'Elevation': 62},
+    {'ID': 'MCGA1', 'State': 'AL', 'Site': 'Mobile/Coast Guard S', 'Latitude': 30.648, 'Longitude': -88.058, 'Elevation': 52},
+    {'ID': 'MHPA1', 'State': 'AL', 'Site': 'Meaher Park', 'Latitude': 30.667, 'Longitude': -87.936, 'Elevation': 33},
+    {'ID': 'OBLA1', 'State': 'AL', 'Site': 'Mobile State Docks', 'Latitude': 30.708, 'Longitude': -88.043, 'Elevation': 0},
+    {'ID': 'PPTA1', 'State': 'AL', 'Site': 'Perdido Pass', 'Latitude': 30.279, 'Longitude': -87.556, 'Elevation': 16},
+    {'ID': 'UNLA2', 'State': 'AL', 'Site': 'Unalaska', 'Latitude': 53.879, 'Longitude': -166.54, 'Elevation': 7},
+    {'ID': 'WBYA1', 'State': 'AL', 'Site': 'Weeks Bay', 'Latitude': 30.417, 'Longitude': -87.825, 'Elevation': 0},
+    {'ID': 'WKXA1', 'State': 'AL', 'Site': 'Weeks Bay Reserve', 'Latitude': 30.421, 'Longitude': -87.829, 'Elevation': 33}
+]
+
+
+
+# Grid-bucket spatial index over airport coordinates
+# Airports are bucketed into lat/lon cells and sorted by cell key, so a batch of track points
+# only ever measures the airports in the cells around it instead of every airport in the list
+class AirportIndex:
+    def __init__(self, latitudes, longitudes, cell_size_deg=0.1):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_size_deg = cell_size_deg
+        self.num_cols = int(np.ceil(360 / cell_size_deg))
+
+        keys = self._cell_keys(*self._cells(self.latitudes, self.longitudes))
+        self.order = np.argsort(keys, kind='stable')  # Airport indexes sorted by cell
+        self.sorted_keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _cells(self, lat, lon):
+        row = np.floor((np.asarray(lat, dtype=np.float64) + 90) / self.cell_size_deg).astype(np.int64)
+        col = np.floor((np.asarray(lon, dtype=np.float64) + 180) / self.cell_size_deg).astype(np.int64)
+        return row, col
+
+    def _cell_keys(self, row, col):
+        return row * self.num_cols + np.mod(col, self.num_cols)  # Wrap around the antimeridian
+
+    # Function to list every (point, airport) pair within radius_km, for a whole batch of points at once
+    def within_radius(self, lat, lon, radius_km, chunk_size=200000):
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        point_parts, airport_parts, distance_parts = [], [], []
+        for start in range(0, len(lat), chunk_size):
+            points, airports, distances = self._within_radius_chunk(lat[start:start + chunk_size], lon[start:start + chunk_size], radius_km)
+            point_parts.append(points + start)
+            airport_parts.append(airports)
+            distance_parts.append(distances)
+        if not point_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(point_parts), np.concatenate(airport_parts), np.concatenate(distance_parts)
+
+    def _within_radius_chunk(self, lat, lon, radius_km):
+        if len(lat) == 0 or len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+        # How many neighbouring cells the radius can reach (longitude cells shrink towards the poles)
+        cell_km = self.cell_size_deg * KM_PER_DEGREE
+        max_abs_lat = min(np.nanmax(np.abs(lat)) + radius_km / KM_PER_DEGREE, 89.9)
+        rows_reach = int(np.ceil(radius_km / cell_km))
+        cols_reach = min(int(np.ceil(radius_km / (cell_km * np.cos(np.radians(max_abs_lat))))), self.num_cols // 2)
+
+        row, col = self._cells(lat, lon)
+        point_ids = np.arange(len(lat))
+        pair_points, pair_slots = [], []
+        for d_row in range(-rows_reach, rows_reach + 1):
+            for d_col in range(-cols_reach, cols_reach + 1):
+                keys = self._cell_keys(row + d_row, col + d_col)
+                left = np.searchsorted(self.sorted_keys, keys, side='left')
+                right = np.searchsorted(self.sorted_keys, keys, side='right')
+                counts = right - left
+                hits = counts > 0
+                if not hits.any():
+                    continue
+                counts = counts[hits]
+                # Expand every [left, right) range into individual (point, airport slot) pairs
+                pair_points.append(np.repeat(point_ids[hits], counts))
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                pair_slots.append(np.repeat(left[hits], counts) + offsets)
+
+        if not pair_points:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        points = np.concatenate(pair_points)
+        airports = self.order[np.concatenate(pair_slots)]
+        distances = haversine_km(lat[points], lon[points], self.latitudes[airports], self.longitudes[airports])
+        close = distances <= radius_km
+        return points[close], airports[close], distances[close]
+
+    # Function to find the nearest airport within max_distance_km for every point
+    # Returns (airport indexes, distances in km), with -1 and inf where no airport is in range
+    def nearest(self, lat, lon, max_distance_km):
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        nearest_index = np.full(len(lat), -1, dtype=np.int64)
+        nearest_distance = np.full(len(lat), np.inf)
+
+        points, airports, distances = self.within_radius(lat, lon, max_distance_km)
+        if len(points):
+            # Sort pairs by point then distance, the first pair of each point is its nearest airport
+            order = np.lexsort((airports, distances, points))
+            points, airports, distances = points[order], airports[order], distances[order]
+            first = np.flatnonzero(np.r_[True, points[1:] != points[:-1]])
+            nearest_index[points[first]] = airports[first]
+            nearest_distance[points[first]] = distances[first]
+        return nearest_index, nearest_distance
+
+    # Function to find every airport inside a latitude/longitude box, in database order
+    def within_box(self, min_lat, max_lat, min_lon, max_lon):
+        (min_row, max_row), (min_col, max_col) = self._cells([min_lat, max_lat], [min_lon, max_lon])
+        num_cells = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if num_cells >= len(self):
+            candidates = np.arange(len(self))  # Box covers more cells than there are airports
+        else:
+            rows, cols = np.meshgrid(np.arange(min_row, max_row + 1), np.arange(min_col, max_col + 1), indexing='ij')
+            keys = self._cell_keys(rows.ravel(), cols.ravel())
+            left = np.searchsorted(self.sorted_keys, keys, side='left')
+            right = np.searchsorted(self.sorted_keys, keys, side='right')
+            counts = right - left
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidates = self.order[np.repeat(left, counts) + offsets]
+        inside = ((self.latitudes[candidates] >= min_lat) & (self.latitudes[candidates] <= max_lat) &
+                  (self.longitudes[candidates] >= min_lon) & (self.longitudes[candidates] <= max_lon))
+        return np.sort(candidates[inside])
+
+
+# Airport records plus the spatial index the landing and low pass detectors query
+class AirportDatabase:
+    def __init__(self, records):
+        self.records = records
+        self.index = AirportIndex(records['latitude'], records['longitude'])
+        self._positions = None
+
+    def __len__(self):
+        return len(self.records)
+
+    # Function to find an airport's position in the database by identifier (-1 if unknown)
+    def find(self, ident):
+        if self._positions is None:
+            self._positions = {str(airport_id): i for i, airport_id in enumerate(self.records['ident'])}
+        return self._positions.get(ident, -1)
+
+
+# Function to convert a list of airport dicts (like ALABAMA_AIRPORTS) into database records
+def airports_to_records(airport_list):
+    records = np.zeros(len(airport_list), dtype=AIRPORT_DTYPE)
+    for i, airport in enumerate(airport_list):
+        records[i] = (airport['ID'], airport['Latitude'], airport['Longitude'], airport['Elevation'], airport.get('Type', ''), airport.get('Site', ''), airport.get('State', ''))
+    return records
+
+# Function to load an OurAirports/FAA-style airport CSV into database records
+def load_airports_csv(airports_csv, types=None):
+    header = pd.read_csv(airports_csv, nrows=0).columns
+    columns = {}
+    for field, candidates in AIRPORT_CSV_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in header:
+                columns[field] = candidate
+                break
+    missing = [field for field in ('ident', 'latitude', 'longitude') if field not in columns]
+    if missing:
+        raise ValueError(f"Airport CSV {airports_csv} has no column for: {', '.join(missing)}")
+
+    df = pd.read_csv(airports_csv, usecols=list(columns.values()), keep_default_na=False, na_values={columns['latitude']: [''], columns['longitude']: ['']})
+    df = df.rename(columns={candidate: field for field, candidate in columns.items()})
+    df = df.dropna(subset=['latitude', 'longitude'])
+    if types is not None and 'type' in df:
+        df = df[df['type'].isin(types)]
+
+    records = np.zeros(len(df), dtype=AIRPORT_DTYPE)
+    for field in AIRPORT_DTYPE.names:
+        if field not in df:
+            continue
+        if field == 'elevation':
+            records[field] = pd.to_numeric(df[field], errors='coerce').fillna(0).to_numpy()
+        elif AIRPORT_DTYPE[field].kind == 'U':
+            records[field] = df[field].astype(str).to_numpy()
+        else:
+            records[field] = df[field].to_numpy()
+    return records
+
+# Function to load an airport CSV through a memory-mapped binary cache kept next to it
+# The cache file name carries the CSV's modification time and size (airports.<mtime>-<size>.npy), so an
+# edited or replaced CSV is always loaded afresh; later process starts only map the .npy file
+# The cache always holds every airport; a types filter is applied after loading (giving an in-memory copy)
+def load_airport_records(airports_csv, cache_file=None, types=None):
+    cache_base = os.path.splitext(cache_file or os.path.splitext(airports_csv)[0] + '.airports.npy')[0]
+    stat = os.stat(airports_csv)
+    cache_file = f"{cache_base}.{stat.st_mtime_ns}-{stat.st_size}.npy"
+    records = None
+    if os.path.exists(cache_file):
+        records = np.load(cache_file, mmap_mode='r')
+        if records.dtype != AIRPORT_DTYPE:
+            records = None
+
+    if records is None:
+        # A per-process temporary name, so workers starting with a cold cache never write the same file
+        temp_file = f"{cache_file}.{os.getpid()}.tmp.npy"
+        np.save(temp_file, load_airports_csv(airports_csv))
+        os.replace(temp_file, cache_file)  # Atomic so a concurrent reader never maps a half-written file
+        records = np.load(cache_file, mmap_mode='r')
+        for stale_file in glob.glob(glob.escape(cache_base) + '.*-*.npy'):
+            if stale_file != cache_file:
+                try:
+                    os.remove(stale_file)  # Caches of earlier versions of the CSV
+                except OSError:
+                    pass
+
+    if types is not None and (records['type'] != '').any():  # Like load_airports_csv, a CSV without types is not filtered
+        records = records[np.isin(records['type'], list(types))]
+    return records
+
+# Function to get the airport database (the Alabama list unless a CSV is given), keeping only the given types
+# It is built once per process for each version of the CSV (its path, modification time and size)
+def get_airport_database(airports_csv=None, types=LANDING_AIRPORT_TYPES):
+    if airports_csv is None:
+        return _airport_database(None, None, None, None)
+    stat = os.stat(airports_csv)
+    return _airport_database(airports_csv, stat.st_mtime_ns, stat.st_size, None if types is None else tuple(types))
+
+@functools.lru_cache(maxsize=8)
+def _airport_database(airports_csv, mtime_ns, size, types):
+    if airports_csv is None:
+        return AirportDatabase(airports_to_records(ALABAMA_AIRPORTS))
+    return AirportDatabase(load_airport_records(airports_csv, types=types))
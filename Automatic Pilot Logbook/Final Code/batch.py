@@ -0,0 +1,156 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from track import to_datetime
+from stitch import group_track_parts, stitch_tracks
+from back_end_final import create_flight_path_map, log_flights, track_source
+from hashing import file_sha256, combined_sha256
+from logbook_store import LogbookStore, LOGBOOK_DB
+
+
+# Logbook fields that come from the pilot rather than the track, with the same defaults as the front end
+DEFAULT_FLIGHT_OPTIONS = {
+    'make_and_model': 'PA28-150',
+    'instrument_approach_num': 0,
+    'instrument_approach_type_location': 'N/A',
+    'airplane_single': True,
+    'airplane_multi': False,
+    'instrument_actual_time': 0.0,
+    'instrument_simulated_hood_time': 0.0,
+    'instrument_simulator_ftd_time': 0.0,
+    'pic': True,
+    'solo': True,
+    'ground_training_received_time': 0.0,
+    'flight_training_received_time': 0.0,
+    'flight_training_given_time': 0.0,
+}
+
+
+# Function to expand directories and glob patterns into a sorted, de-duplicated list of KML files
+def find_track_files(paths):
+    track_files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            track_files.update(glob.glob(os.path.join(path, '**', '*.kml'), recursive=True))
+        else:
+            track_files.update(match for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+    return sorted(os.path.abspath(track_file) for track_file in track_files)
+
+# Function to process one flight (a track log, or the parts of a split recording) inside a worker process
+# Everything is written to the worker's own scratch directory first and only moved into maps_dir once
+# complete, so concurrent workers never share a file name and a failed file leaves nothing behind
+# Returns the flight as a dict for log_flights
+def process_flight(track_files, flight_options, maps_dir, scratch_root, airports_csv=None, content_hashes=None):
+    scratch_dir = os.path.join(scratch_root, f"worker-{os.getpid()}")
+    os.makedirs(scratch_dir, exist_ok=True)
+
+    track = stitch_tracks(track_files, content_hashes)
+    name = os.path.splitext(os.path.basename(track_files[0]))[0]
+    map_name = f"map_{to_datetime(track.timestamps_ns[0]).strftime('%m-%d-%Y')}_{name}.html"
+    scratch_map = os.path.join(scratch_dir, map_name)
+    row = create_flight_path_map(track, airports_csv=airports_csv, map_html=scratch_map, **flight_options).row
+
+    map_html = os.path.join(maps_dir, map_name)
+    os.replace(scratch_map, map_html)
+    return {'source': track_source(track_files), 'start_ns': int(track.timestamps_ns[0]), 'row': row, 'artifacts': {'map_html': map_html}}
+
+# Function to process many track logs across a process pool and add them to the logbook database
+# (logbook_db=None only returns the rows); the parts of split recordings are stitched into one flight each, and
+# flights already in the logbook (by content hash), or repeated within the batch, are skipped after hashing
+# Returns (rows, failures, skipped) where failures maps flight source -> error message and skipped lists sources
+def process_track_files(track_files, flight_options=None, logbook_db=LOGBOOK_DB, maps_dir='.',
+                        airports_csv=None, max_workers=None, progress=None):
+    flight_options = dict(DEFAULT_FLIGHT_OPTIONS, **(flight_options or {}))
+    os.makedirs(maps_dir, exist_ok=True)
+    results = []
+    failures = {}
+
+    flights = []
+    for flight_files in group_track_parts(track_files):
+        content_hashes = [file_sha256(track_file) for track_file in flight_files]
+        flights.append((combined_sha256(content_hashes), flight_files, content_hashes))
+    store = LogbookStore(logbook_db) if logbook_db else None
+    known = store.known_flights(content_hash for content_hash, _, _ in flights) if store is not None else set()
+    new_flights = {}  # Content hash -> (files, per-file hashes) of the first flight with that content
+    skipped = []
+    for content_hash, flight_files, content_hashes in flights:
+        if content_hash in known or content_hash in new_flights:
+            skipped.append(track_source(flight_files))
+        else:
+            new_flights[content_hash] = (flight_files, content_hashes)
+
+    scratch_root = tempfile.mkdtemp(prefix='logbook-batch-', dir=maps_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(process_flight, flight_files, flight_options, maps_dir, scratch_root, airports_csv, content_hashes): content_hash
+                for content_hash, (flight_files, content_hashes) in new_flights.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                content_hash = futures[future]
+                source = track_source(new_flights[content_hash][0])
+                try:
+                    results.append(dict(future.result(), content_hash=content_hash))
+                except Exception as e:
+                    failures[source] = f"{type(e).__name__}: {e}"
+                if progress is not None:
+                    progress(done, len(futures), source)
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+
+    # Flights on the same day keep their take-off order
+    if store is not None:
+        results = log_flights(results, store)
+    else:
+        results.sort(key=lambda result: result['start_ns'])
+    return [result['row'] for result in results], failures, skipped
+
+
+# Command line: python batch.py KML/ "exports/2024-*.kml" --workers 8 --maps-dir maps
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build pilot logbook rows from a directory or glob of KML track logs.')
+    parser.add_argument('paths', nargs='+', help='KML files, directories (searched recursively) or glob patterns')
+    parser.add_argument('--logbook', default=LOGBOOK_DB, help='Logbook database to add the new flights to'
+                        ' (export it as CSV with logbook_store.py export)')
+    parser.add_argument('--maps-dir', default='maps', help='Directory for the per-flight HTML maps')
+    parser.add_argument('--airports-csv', default=None, help='Airport database CSV (default: built-in Alabama list)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--make-and-model', default=DEFAULT_FLIGHT_OPTIONS['make_and_model'])
+    parser.add_argument('--multi', action='store_true', help='Log the time as multi-engine instead of single')
+    parser.add_argument('--no-pic', action='store_true', help='Do not log the time as PIC')
+    parser.add_argument('--no-solo', action='store_true', help='Do not log the time as solo')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    track_files = find_track_files(args.paths)
+    if not track_files:
+        print('No KML files found.', file=sys.stderr)
+        return 1
+    flight_options = {
+        'make_and_model': args.make_and_model,
+        'airplane_single': not args.multi,
+        'airplane_multi': args.multi,
+        'pic': not args.no_pic,
+        'solo': not args.no_solo,
+    }
+
+    start_time = time.perf_counter()
+    rows, failures, skipped = process_track_files(
+        track_files, flight_options, args.logbook, args.maps_dir, args.airports_csv, args.workers,
+        progress=lambda done, total, source: print(f"[{done}/{total}] {source}")
+    )
+    print(f"Logged {len(rows)} flights to {args.logbook} in {time.perf_counter() - start_time:.1f} s"
+          f" ({len(skipped)} already logged)")
+    for source, error in failures.items():
+        print(f"Failed {source}: {error}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from track import Track
+from maneuvers import find_steep_turns
+from back_end_final import create_flight_path_map, main as process_kml
+from legacy_baseline import kml_to_csv, calculate_speed_altitude_course
+from batch import DEFAULT_FLIGHT_OPTIONS
+from synthetic import scenario, generate_flight, write_kml, expected_events_path, write_expected_events
+
+
+BENCHMARK_HISTORY = 'benchmark_history.json'
+SAMPLE_KML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'KML')
+SYNTHETIC_CASES = [(hours, rate_hz) for rate_hz in (1, 10) for hours in (1, 5, 12)]
+SYNTHETIC_NOISE_M = 3  # Realistic GPS noise and dropouts, so simplification and event detection see real-looking tracks
+SYNTHETIC_DROPOUTS_PER_HOUR = 2
+STAGES = ['kml_to_csv', 'calculate_speed_altitude_course', 'parse_track', 'find_steep_turns', 'create_flight_path_map', 'main']
+REGRESSION_THRESHOLD = 0.10  # A stage more than 10% slower than the baseline is flagged
+MIN_REGRESSION_SECONDS = 0.01  # ...unless it is slower by less than this, which is timer noise on tiny stages
+
+
+# Function to count the data rows of a CSV file
+def _count_csv_rows(csv_file):
+    with open(csv_file) as file:
+        return sum(1 for _ in file) - 1
+
+# Function to get this process's peak resident memory in MB
+# /proc's VmHWM starts afresh in a new program, while getrusage's ru_maxrss carries the parent's peak over
+# fork and exec (Linux reports KB; macOS, which has no /proc, reports bytes)
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+# Function to run one stage on one track log and return (seconds, points)
+# Inputs a stage needs (the CSV, the parsed track) are prepared before the clock starts; main runs cold
+# on a fresh copy of the file into a fresh logbook, so neither the track cache nor the logbook is ever warm
+def _time_stage(stage, kml_file, work_dir):
+    if stage in ('find_steep_turns', 'create_flight_path_map'):
+        track = Track.from_kml(kml_file)
+    elif stage == 'calculate_speed_altitude_course':
+        kml_to_csv(kml_file, os.path.join(work_dir, 'track.csv'))
+    elif stage == 'main':
+        run_dir = tempfile.mkdtemp(dir=work_dir)
+        kml_file = shutil.copy(kml_file, run_dir)
+
+    start_time = time.perf_counter()
+    if stage == 'kml_to_csv':
+        kml_to_csv(kml_file, os.path.join(work_dir, 'track.csv'))
+    elif stage == 'calculate_speed_altitude_course':
+        calculate_speed_altitude_course(os.path.join(work_dir, 'track.csv'), os.path.join(work_dir, 'speed.csv'))
+    elif stage == 'parse_track':
+        track = Track.from_kml(kml_file)
+    elif stage == 'find_steep_turns':
+        find_steep_turns(track)
+    elif stage == 'create_flight_path_map':
+        create_flight_path_map(track, **DEFAULT_FLIGHT_OPTIONS, map_html=os.path.join(work_dir, 'map.html'))
+    elif stage == 'main':
+        process_kml(kml_file, **DEFAULT_FLIGHT_OPTIONS, logbook_db=os.path.join(run_dir, 'pilot_logbook.sqlite'),
+                    map_html=os.path.join(run_dir, 'map.html'))
+    seconds = time.perf_counter() - start_time
+
+    if stage == 'kml_to_csv':
+        points = _count_csv_rows(os.path.join(work_dir, 'track.csv'))
+    elif stage == 'calculate_speed_altitude_course':
+        points = _count_csv_rows(os.path.join(work_dir, 'speed.csv'))
+    elif stage == 'main':
+        points = len(Track.from_kml(kml_file))
+        shutil.rmtree(run_dir, ignore_errors=True)
+    else:
+        points = len(track)
+    return seconds, points
+
+# Function to benchmark one stage on one track log inside a fresh worker process (see run_benchmarks)
+# The fastest of repeat runs is kept; peak RSS is the worker's high-water mark, imports and setup included
+def benchmark_stage(stage, kml_file, work_dir, repeat=1):
+    os.makedirs(work_dir, exist_ok=True)
+    seconds, points = min(_time_stage(stage, kml_file, work_dir) for _ in range(repeat))
+    return {
+        'seconds': round(seconds, 4),
+        'points': points,
+        'points_per_second': round(points / seconds) if seconds > 0 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+# Function to list the benchmark cases as (name, KML file): the sample track logs, then synthetic endurance
+# flights of every length and sample rate in SYNTHETIC_CASES, written (with their expected-events sidecars)
+# to data_dir if not already there; the fixed seed makes every run benchmark the same tracks
+def benchmark_cases(data_dir, sample=True, synthetic=True):
+    cases = []
+    if sample:
+        cases.extend((os.path.splitext(os.path.basename(kml_file))[0], kml_file)
+                     for kml_file in sorted(glob.glob(os.path.join(SAMPLE_KML_DIR, '*.kml'))))
+    if synthetic:
+        os.makedirs(data_dir, exist_ok=True)
+        for hours, rate_hz in SYNTHETIC_CASES:
+            name = f"synthetic_{hours}h_{rate_hz}hz"
+            kml_file = os.path.join(data_dir, f"{name}.kml")
+            if not os.path.exists(kml_file):
+                start, steps = scenario('endurance', hours)
+                track, expected = generate_flight(steps, rate_hz, start, SYNTHETIC_NOISE_M, SYNTHETIC_DROPOUTS_PER_HOUR)
+                write_kml(track, kml_file)
+                write_expected_events(expected, expected_events_path(kml_file), scenario='endurance', hours=hours, rate_hz=rate_hz)
+            cases.append((name, kml_file))
+    return cases
+
+# Function to run every stage on every case and return the run as a dict for the history file
+# Each stage gets its own freshly spawned worker process (max_tasks_per_child=1), so neither this process nor
+# another stage's memory counts towards its peak RSS
+def run_benchmarks(cases, stages=STAGES, repeat=1, work_dir=None, progress=None):
+    work_dir = work_dir or tempfile.mkdtemp(prefix='logbook-benchmark-')
+    results = {}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for name, kml_file in cases:
+            results[name] = {}
+            for stage in stages:
+                results[name][stage] = executor.submit(benchmark_stage, stage, kml_file, os.path.join(work_dir, name), repeat).result()
+                if progress is not None:
+                    progress(name, stage, results[name][stage])
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+# Function to load the benchmark history: {'baseline': run or None, 'runs': [run, ...]}
+def load_history(history_file=BENCHMARK_HISTORY):
+    try:
+        with open(history_file) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'baseline': None, 'runs': []}
+
+# Function to append a run to the history, optionally making it the baseline (the first run always is)
+def save_run(run, history_file=BENCHMARK_HISTORY, baseline=False):
+    history = load_history(history_file)
+    history['runs'].append(run)
+    if baseline or history['baseline'] is None:
+        history['baseline'] = run
+    temp_file = f"{history_file}.tmp"
+    with open(temp_file, 'w') as file:
+        json.dump(history, file, indent=2)
+    os.replace(temp_file, history_file)
+    return history
+
+# Function to compare a run with the baseline, stage by stage
+# Returns a list of (case, stage, baseline seconds, seconds, change) for stages in both runs, and the subset
+# that slowed down by more than the threshold (and by at least MIN_REGRESSION_SECONDS)
+def compare_runs(baseline, run, threshold=REGRESSION_THRESHOLD):
+    comparisons = []
+    for case, stages in run['results'].items():
+        for stage, result in stages.items():
+            base = baseline['results'].get(case, {}).get(stage)
+            if base is None or not base['seconds']:
+                continue
+            change = result['seconds'] / base['seconds'] - 1
+            comparisons.append((case, stage, base['seconds'], result['seconds'], change))
+    regressions = [
+        comparison for comparison in comparisons
+        if comparison[4] > threshold and comparison[3] - comparison[2] >= MIN_REGRESSION_SECONDS
+    ]
+    return comparisons, regressions
+
+# Function to print a comparison table and return the number of regressions
+def print_comparison(baseline, run, threshold=REGRESSION_THRESHOLD):
+    comparisons, regressions = compare_runs(baseline, run, threshold)
+    print(f"Baseline {baseline['timestamp']}  vs  run {run['timestamp']}  (threshold +{threshold:.0%})")
+    for comparison in comparisons:
+        case, stage, base_seconds, seconds, change = comparison
+        flag = '  SLOWER' if comparison in regressions else ''
+        print(f"{case:<60} {stage:<32} {base_seconds:9.3f} s {seconds:9.3f} s {change:+7.1%}{flag}")
+    print(f"{len(regressions)} of {len(comparisons)} stages slowed by more than {threshold:.0%}")
+    return len(regressions)
+
+
+# Command line:
+#   python benchmark.py run [--quick] [--repeat 3] [--save-baseline] [--compare]
+#   python benchmark.py compare [--threshold 0.1]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the logbook pipeline stages on sample and synthetic track logs.')
+    parser.add_argument('command', choices=['run', 'compare'])
+    parser.add_argument('--history', default=BENCHMARK_HISTORY, help='JSON file the runs and the baseline are kept in')
+    parser.add_argument('--quick', action='store_true', help='Only the sample track logs (no synthetic flights)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage; the fastest is recorded')
+    parser.add_argument('--data-dir', default=None, help='Directory to keep the synthetic KML files in (default: temporary)')
+    parser.add_argument('--save-baseline', action='store_true', help='Make this run the baseline for comparisons')
+    parser.add_argument('--compare', action='store_true', help='Compare this run with the baseline afterwards')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='Slowdown that counts as a regression')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'compare':
+        history = load_history(args.history)
+        if history['baseline'] is None or not history['runs']:
+            print(f"No benchmark runs in {args.history}.", file=sys.stderr)
+            return 1
+        return 1 if print_comparison(history['baseline'], history['runs'][-1], args.threshold) else 0
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='logbook-synthetic-')
+    try:
+        cases = benchmark_cases(data_dir, synthetic=not args.quick)
+        run = run_benchmarks(
+            cases, args.stages, args.repeat,
+            progress=lambda name, stage, result: print(
+                f"{name:<60} {stage:<32} {result['seconds']:9.3f} s {result['peak_rss_mb']:8.1f} MB"
+                f" {result['points_per_second'] or 0:>12,} points/s"
+            )
+        )
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    history = save_run(run, args.history, args.save_baseline)
+    print(f"Saved run to {args.history}")
+    if args.compare and history['baseline'] is not run:
+        return 1 if print_comparison(history['baseline'], run, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
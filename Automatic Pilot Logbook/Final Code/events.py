@@ -0,0 +1,163 @@
+from collections import namedtuple
+import numpy as np
+from solar import classify_light, NS_PER_MINUTE
+from sliding_window import forward_window_min
+
+
+AIRPORT_RADIUS_KM = 2  # Landings and low passes are only logged within this distance of an airport
+GROUND_AGL_FT = 100  # Below this height above the field the aircraft is treated as on the runway
+LIFTOFF_AGL_FT = 150  # Leaving the runway means climbing above this, so GPS noise around 100 ft can't toggle it
+PATTERN_AGL_FT = 300  # Descending below this height near an airport starts an approach
+PATTERN_EXIT_AGL_FT = 400  # An approach only ends by climbing back above this, so GPS noise around 300 ft can't toggle it
+LOW_PASS_MAX_AGL_FT = 250  # An approach that got below this and climbed away without touching down is a low pass
+DESCENT_WINDOW_NS = 10 * 10**9  # Descending means being lower this long after the sample
+TAKEOFF_ROLL_SPEED_KTS = 30  # Faster than any taxi, slower than rotation
+LANDING_SPEED_KTS = 50  # Off the runway and faster than this the aircraft is flying; on it, slowing through this starts the full stop check
+FULL_STOP_SPEED_KTS = 10  # A landing is a full stop when the aircraft then slows below this within 1 minute
+
+# Flight phases, one per sample
+TAXI = 0
+TAKEOFF_ROLL = 1
+AIRBORNE = 2
+APPROACH = 3
+ROLLOUT = 4
+PHASE_NAMES = ['taxi', 'takeoff roll', 'airborne', 'approach', 'rollout']
+
+# Event types
+TAKEOFF = 'takeoff'
+LANDING = 'landing'
+LOW_PASS = 'low pass'
+
+# One detected event; full_stop is only set for landings and min_agl_ft only for low passes
+FlightEvent = namedtuple('FlightEvent', ['kind', 'index', 'timestamp_ns', 'airport_id', 'light', 'full_stop', 'min_agl_ft'])
+
+
+# Function to run the taxi -> takeoff roll -> airborne -> approach -> touchdown -> rollout state machine
+# over the whole track in one linear pass
+# Returns (events, phases): the list of FlightEvents in time order and the int8 phase of every sample
+def detect_flight_events(track, airport_db, light=None):
+    timestamps_ns = track.timestamps_ns
+    speeds = track.speed_kts
+    if light is None:
+        light = classify_light(timestamps_ns, track.latitude, track.longitude)
+    num_points = len(track)
+    phases = np.full(num_points, TAXI, dtype=np.int8)
+    events = []
+    if num_points == 0:
+        return events, phases
+
+    # Height above the nearest airport within range (NaN when there is none, which counts as airborne)
+    closest_indexes, _ = airport_db.index.nearest(track.latitude, track.longitude, max_distance_km=AIRPORT_RADIUS_KM)
+    in_range = closest_indexes >= 0
+    elevations = np.where(in_range, airport_db.records['elevation'][closest_indexes].astype(np.float64), np.nan)
+    agl = track.altitude_ft - elevations
+    with np.errstate(invalid='ignore'):
+        on_ground = in_range & (agl < GROUND_AGL_FT)
+        in_pattern = in_range & (agl < PATTERN_AGL_FT)
+        lifted_off = ~in_range | (agl >= LIFTOFF_AGL_FT)
+        left_pattern = ~in_range | (agl >= PATTERN_EXIT_AGL_FT)
+
+    # Sustained descent: lower at the last sample within the next 10 seconds, which single noisy samples can't fake
+    altitude_ft = track.altitude_ft
+    ahead_indexes = np.searchsorted(timestamps_ns, timestamps_ns + DESCENT_WINDOW_NS, side='right') - 1
+    descending = altitude_ft[ahead_indexes] < altitude_ft
+
+    # Slowest speed within the minute after every point, so each full stop check is a single lookup;
+    # the check runs once the rollout slows through landing speed, as touchdown itself is only known to ~100 ft
+    full_stops = forward_window_min(timestamps_ns, speeds, NS_PER_MINUTE) < FULL_STOP_SPEED_KTS
+
+    airport_ids = airport_db.records['ident']
+    closest_list = closest_indexes.tolist()
+    on_ground_list = on_ground.tolist()
+    in_pattern_list = in_pattern.tolist()
+    lifted_off_list = lifted_off.tolist()
+    left_pattern_list = left_pattern.tolist()
+    descending_list = descending.tolist()
+    agl_list = agl.tolist()
+    speed_list = np.asarray(speeds, dtype=np.float64).tolist()
+
+    # Function to record an event at sample i
+    def emit(kind, i, airport_index, full_stop=None, min_agl_ft=None):
+        airport_id = str(airport_ids[airport_index]) if airport_index >= 0 else None
+        events.append(FlightEvent(kind, i, int(timestamps_ns[i]), airport_id, int(light[i]), full_stop, min_agl_ft))
+
+    # A log can start anywhere; a fast start on the runway is a takeoff in progress, never a landing
+    if on_ground_list[0]:
+        phase = TAKEOFF_ROLL if speed_list[0] >= TAKEOFF_ROLL_SPEED_KTS else TAXI
+    else:
+        phase = AIRBORNE
+    # An approach can only start after the aircraft has been above the pattern since its last takeoff or approach,
+    # so a climb-out jittering around pattern height never opens one (a log starting airborne counts as above)
+    approach_armed = phase == AIRBORNE
+    approach_airport = -1
+    approach_min_agl = None
+    landing = None  # Index in events of the landing whose rollout hasn't decided touch and go or full stop yet
+
+    # Function to settle the pending landing as a full stop or a touch and go
+    def classify_landing(full_stop):
+        events[landing] = events[landing]._replace(full_stop=full_stop)
+
+    for i in range(num_points):
+        speed = speed_list[i]
+        on_ground = on_ground_list[i]
+        in_pattern = in_pattern_list[i]
+
+        if phase == TAXI:
+            if on_ground and speed >= TAKEOFF_ROLL_SPEED_KTS:
+                phase = TAKEOFF_ROLL
+            elif not on_ground and speed >= LANDING_SPEED_KTS:
+                # The takeoff roll fell in a gap in the log
+                phase = AIRBORNE
+                approach_armed = False
+                emit(TAKEOFF, i, closest_list[i])
+        elif phase == TAKEOFF_ROLL:
+            if lifted_off_list[i]:
+                phase = AIRBORNE
+                approach_armed = False
+                emit(TAKEOFF, i, closest_list[i])
+            elif speed < TAKEOFF_ROLL_SPEED_KTS:
+                phase = TAXI  # Rejected takeoff
+        elif phase == AIRBORNE:
+            if on_ground and speed < TAKEOFF_ROLL_SPEED_KTS:
+                phase = TAXI  # The log resumed on the ground after a gap
+            elif in_pattern and approach_armed and descending_list[i]:
+                phase = APPROACH
+                approach_armed = False
+                approach_airport = closest_list[i]
+                approach_min_agl = agl_list[i]
+        elif phase == APPROACH:
+            if on_ground:
+                # Touchdown at any speed; the rollout decides whether it was a full stop
+                phase = ROLLOUT
+                landing = len(events)
+                emit(LANDING, i, closest_list[i])
+            elif left_pattern_list[i]:
+                # Climbed away or left without touching down
+                phase = AIRBORNE
+                if approach_min_agl < LOW_PASS_MAX_AGL_FT:
+                    emit(LOW_PASS, i, approach_airport, min_agl_ft=approach_min_agl)
+            else:
+                approach_min_agl = min(approach_min_agl, agl_list[i])
+        elif phase == ROLLOUT:
+            if lifted_off_list[i]:
+                phase = AIRBORNE  # Touch and go
+                approach_armed = False
+                if landing is not None:
+                    classify_landing(False)
+                    landing = None
+                emit(TAKEOFF, i, closest_list[i])
+            elif landing is not None and speed < LANDING_SPEED_KTS:
+                classify_landing(bool(full_stops[i]))
+                landing = None
+            if phase == ROLLOUT and speed < FULL_STOP_SPEED_KTS:
+                phase = TAXI
+
+        phases[i] = phase
+        if not in_pattern:
+            approach_armed = True
+
+    # The log ended before the rollout slowed down
+    if landing is not None:
+        classify_landing(bool(full_stops[events[landing].index]))
+    return events, phases
+
@@ -1,15 +1,67 @@
+import json
 import os
-import io
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
 import folium
 
-# Import the backend function
-from back_end_final import main
-
-# Ensure the temp directory exists
-if not os.path.exists("temp"):
-    os.makedirs("temp")
+# Import the backend functions
+from back_end_final import analyse_track_bytes, analyse_track_files, logbook_dataframe, track_source
+from logbook_store import LogbookStore, LOGBOOK_DB
+from hashing import bytes_sha256, file_sha256, combined_sha256
+from stitch import PART_PATTERN, group_track_parts
+
+LOGBOOK_CSV = "pilot_logbook.csv"
+PROFILE_OPTIONS = {"Off": False, "Stage timings": True, "Stage timings + cProfile": "cprofile"}
+# Analysed flights carry their map HTML (often several MB), so the memo shared by every session stays small
+CACHED_FLIGHTS = 32
+CACHED_FLIGHT_TTL = "1h"
+
+
+# Worker processes shared by every session, so parsing and analysis never hold up the server's script threads
+@st.cache_resource
+def get_executor():
+    return ProcessPoolExecutor()
+
+# The shared logbook database, also written by back_end_final.main and batch.py (SQLite serializes the
+# writers); a CSV logbook from before the database existed is imported the first time
+@st.cache_resource
+def get_logbook_store():
+    store = LogbookStore(LOGBOOK_DB)
+    if len(store) == 0 and os.path.exists(LOGBOOK_CSV):
+        store.import_csv(LOGBOOK_CSV)
+    return store
+
+# Function to analyse one track log in the worker pool, memoized on the file's content hash and the
+# flight options (the file name and bytes are left out of the cache key)
+@st.cache_data(show_spinner=False, max_entries=CACHED_FLIGHTS, ttl=CACHED_FLIGHT_TTL)
+def analyse_track(content_hash, flight_options, _file_name, _kml_bytes):
+    return get_executor().submit(analyse_track_bytes, _kml_bytes, _file_name, flight_options).result()
+
+# Function to analyse the parts of one split recording (saved in the session's directory) as one flight,
+# memoized the same way on the combined hash of the parts
+@st.cache_data(show_spinner=False, max_entries=CACHED_FLIGHTS, ttl=CACHED_FLIGHT_TTL)
+def analyse_track_parts(content_hash, flight_options, _file_name, _track_files):
+    return get_executor().submit(analyse_track_files, _track_files, flight_options).result()
+
+# Function to analyse one flight: data is the file's bytes or the list of part files
+# With profiling on, the worker always runs instead of the memoized functions, so the timings shown are
+# never those of an earlier run (and the cache never holds a profile report)
+def analyse_flight(content_hash, flight_options, profile, file_name, data):
+    if not profile:
+        if isinstance(data, list):
+            return analyse_track_parts(content_hash, flight_options, file_name, data)
+        return analyse_track(content_hash, flight_options, file_name, data)
+    if isinstance(data, list):
+        return get_executor().submit(analyse_track_files, data, flight_options, None, profile).result()
+    return get_executor().submit(analyse_track_bytes, data, file_name, flight_options, None, profile).result()
+
+# Each browser session gets its own working directory for maps and uploaded parts; it is removed when the
+# session ends and its state (holding the only reference) is garbage collected
+if "work_dir" not in st.session_state:
+    st.session_state.work_dir = tempfile.TemporaryDirectory(prefix="logbook-session-")
 
 # Streamlit app
 st.title("Automatic Pilot Logbook")
@@ -38,78 +90,155 @@ with col3:
     flight_training_received_time = st.number_input("Flight Training Received Time", min_value=0.0, value=0.0, format="%.1f", step=0.1)
     flight_training_given_time = st.number_input("Flight Training Given Time", min_value=0.0, value=0.0, format="%.1f", step=0.1)
 
-# Initialize session state for CSV data
-if "csv_data" not in st.session_state:
-    st.session_state.csv_data = None
+# Per-stage timings of the analysis, for finding out where a slow "Process Data" spends its time
+profile = PROFILE_OPTIONS[st.selectbox("Profiling", list(PROFILE_OPTIONS))]
+
+# Initialize session state for the flights logged in this session
+if "new_flights" not in st.session_state:
+    st.session_state.new_flights = None
+if "map_file" not in st.session_state:
+    st.session_state.map_file = None
+if "profiles" not in st.session_state:
+    st.session_state.profiles = None
 
 if st.button("Process Data"):
-    if kml_files is not None:
+    if kml_files:
         try:
-            all_data = []
+            flight_options = {
+                "make_and_model": make_and_model,
+                "instrument_approach_num": instrument_approach_num,
+                "instrument_approach_type_location": instrument_approach_type_location,
+                "airplane_single": airplane_type == "Single",
+                "airplane_multi": airplane_type == "Multi",
+                "instrument_actual_time": instrument_actual_time,
+                "instrument_simulated_hood_time": instrument_simulated_hood_time,
+                "instrument_simulator_ftd_time": instrument_simulator_ftd_time,
+                "pic": pic,
+                "solo": solo,
+                "ground_training_received_time": ground_training_received_time,
+                "flight_training_received_time": flight_training_received_time,
+                "flight_training_given_time": flight_training_given_time,
+            }
+
+            # Parts of split recordings (...-partNN.kml) are saved in this session's directory and stitched
+            # into one flight each; every other file is analysed straight from memory
+            uploads = {}  # Content hash -> (name, file bytes or part files)
+            part_files = []
             for kml_file in kml_files:
-                st.write(f"Uploading file {kml_file.name}...")
-                # Save the uploaded file
-                input_kml_path = os.path.join("temp", kml_file.name)
-                with open(input_kml_path, "wb") as f:
-                    f.write(kml_file.getbuffer())
-                st.write(f"File {kml_file.name} uploaded successfully.")
-
-                # Call the backend function
-                st.write(f"Processing file {kml_file.name}...")
-                main(
-                    input_kml_file=input_kml_path,
-                    make_and_model=make_and_model,
-                    instrument_approach_num=instrument_approach_num,
-                    instrument_approach_type_location=instrument_approach_type_location,
-                    airplane_single=airplane_type == "Single",
-                    airplane_multi=airplane_type == "Multi",
-                    instrument_actual_time=instrument_actual_time,
-                    instrument_simulated_hood_time=instrument_simulated_hood_time,
-                    instrument_simulator_ftd_time=instrument_simulator_ftd_time,
-                    pic=pic,
-                    solo=solo,
-                    ground_training_received_time=ground_training_received_time,
-                    flight_training_received_time=flight_training_received_time,
-                    flight_training_given_time=flight_training_given_time
-                )
-                st.write(f"File {kml_file.name} processed successfully.")
-
-                # Read the processed CSV data and append to the list
-                output_df = pd.read_csv("pilot_logbook.csv")
-                all_data.append(output_df)
-
-            # Combine all data into a single DataFrame
-            combined_df = pd.concat(all_data, ignore_index=True)
-
-            # Store combined data in session state
-            st.session_state.csv_data = combined_df.to_csv(index=False)
+                kml_bytes = kml_file.getvalue()
+                if PART_PATTERN.search(kml_file.name):
+                    part_file = os.path.join(st.session_state.work_dir.name, kml_file.name)
+                    with open(part_file, "wb") as f:
+                        f.write(kml_bytes)
+                    part_files.append(part_file)
+                else:
+                    uploads.setdefault(bytes_sha256(kml_bytes), (kml_file.name, kml_bytes))
+            for flight_files in group_track_parts(part_files):
+                content_hash = combined_sha256([file_sha256(part_file) for part_file in flight_files])
+                uploads.setdefault(content_hash, (track_source(flight_files), flight_files))
+
+            # Flights already in the logbook are not processed again
+            known = get_logbook_store().known_flights(uploads)
+            if known:
+                st.info(f"{len(known)} of the flights are already in the logbook.")
+
+            # Send every new flight to the worker pool at once and report each one as it finishes
+            start_time = time.perf_counter()
+            progress = st.progress(0.0, text=f"Processing {len(uploads) - len(known)} flights...")
+            results = []
+            with ThreadPoolExecutor(max_workers=max(len(uploads) - len(known), 1)) as waiters:
+                futures = {}
+                for content_hash, (file_name, data) in uploads.items():
+                    if content_hash not in known:
+                        futures[waiters.submit(analyse_flight, content_hash, flight_options, profile, file_name, data)] = file_name
+                for done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        results.append(future.result())
+                        st.write(f"File {futures[future]} processed successfully.")
+                    except Exception as e:
+                        st.error(f"An error occurred while processing {futures[future]}: {e}")
+                    progress.progress(done / len(futures), text=f"Processed {done} of {len(futures)} flights")
+
+            # Add the new flights to the shared logbook
+            new_flights = get_logbook_store().add_flights(results)
+
+            # Keep only the new rows in session state; the logbook itself is never read back
+            st.session_state.new_flights = [
+                {"content_hash": flight["content_hash"], "row": flight["row"]} for flight in new_flights
+            ]
+            # Save the most recent flight's map in this session's directory; session state only keeps its path
+            if results:
+                latest = max(results, key=lambda result: result["start_ns"])
+                st.session_state.map_file = os.path.join(st.session_state.work_dir.name, latest["map_name"])
+                with open(st.session_state.map_file, "w", encoding="utf-8") as f:
+                    f.write(latest["map_html"])
+            st.session_state.profiles = {
+                "wall_s": time.perf_counter() - start_time,
+                "reports": [result["profile"] for result in results if result.get("profile")],
+            } if profile else None
 
         except Exception as e:
             st.error(f"An error occurred: {e}")
     else:
         st.error("Please upload KML files.")
 
-# Display and edit CSV data if available
-if st.session_state.csv_data:
-    st.subheader("Data Verification - 5 Most Recent Flights")
-    combined_df = pd.read_csv(io.StringIO(st.session_state.csv_data))
-    edited_df = st.data_editor(combined_df.tail(5))
+# Display and edit the flights logged in this session
+if st.session_state.new_flights:
+    st.subheader("Data Verification - New Flights")
+    new_df = logbook_dataframe(flight["row"] for flight in st.session_state.new_flights)
+    edited_df = st.data_editor(new_df, num_rows="fixed")
 
     if st.button("Submit Changes"):
         try:
-            st.write("Saving changes to CSV file...")
-            edited_df.to_csv("pilot_logbook.csv", index=False)
+            # Only the edited flights' rows are replaced; the rest of the logbook is kept as it is
+            st.write("Saving changes to the logbook...")
+            edited_rows = edited_df.astype(object).where(edited_df.notna(), None).values.tolist()
+            edited_flights = [dict(flight, row=edited_row) for flight, edited_row in zip(st.session_state.new_flights, edited_rows)]
+            get_logbook_store().upsert_flights(edited_flights)
             st.success("Changes saved successfully.")
-            st.write("Updated CSV Data:")
-            st.dataframe(edited_df.tail(5))
+            st.write("Updated Data:")
+            st.dataframe(edited_df)
 
-            # Update session state with new CSV data
-            st.session_state.csv_data = edited_df.to_csv(index=False)
+            # Update session state with the edited rows
+            st.session_state.new_flights = edited_flights
         except Exception as e:
             st.error(f"An error occurred while saving changes: {e}")
 
-    # Display the HTML map
-    st.subheader("Interactive Map")
-    map_html = f"map_{pd.to_datetime(pd.read_csv(io.StringIO(st.session_state.csv_data))['Date'].iloc[-1]).strftime('%m-%d-%Y')}.html"
-    with open(map_html, "r") as f:
-        st.components.v1.html(f.read(), height=600)
\ No newline at end of file
+    # Display the HTML map of the most recent flight processed in this session
+    if st.session_state.map_file:
+        st.subheader("Interactive Map")
+        with open(st.session_state.map_file, encoding="utf-8") as f:
+            st.components.v1.html(f.read(), height=600)
+
+# Stage timings of the last "Process Data" (each flight's report is also saved as JSON by its worker)
+if st.session_state.profiles:
+    with st.expander("Processing Timings"):
+        st.write(f"Process Data took {st.session_state.profiles['wall_s']:.2f} s in total.")
+        for report in st.session_state.profiles["reports"]:
+            st.markdown(f"**{report['source']}**: {report['wall_s']:.2f} s wall, {report['cpu_s']:.2f} s CPU")
+            st.dataframe(pd.DataFrame(report["stages"]), hide_index=True)
+            if report["counters"]:
+                st.write(report["counters"])
+            if report.get("cprofile"):
+                st.dataframe(pd.DataFrame(report["cprofile"]), hide_index=True)
+            st.download_button("Download Report JSON", json.dumps(report, indent=2), key=report["report_file"],
+                               file_name=os.path.basename(report["report_file"]), mime="application/json")
+
+# Logbook totals and currency, read from the running rollups rather than summed over every flight
+store = get_logbook_store()
+totals = store.totals()
+currency = store.currency()
+st.subheader("Totals and Currency")
+total_cols = st.columns(5)
+for col, label in zip(total_cols, ["Total", "PIC", "Night", "Day XC (All)", "Night XC (All)"]):
+    col.metric(label, f"{totals[label]:.1f}")
+currency_cols = st.columns(3)
+currency_cols[0].metric("Landings (90 days)", currency.day_landings + currency.night_landings,
+                        "Passenger current" if currency.passenger_current else "Not passenger current", delta_color="off")
+currency_cols[1].metric("Night Full Stops (90 days)", currency.night_full_stop_landings,
+                        "Night current" if currency.night_current else "Not night current", delta_color="off")
+currency_cols[2].metric("Approaches (6 months)", currency.instrument_approaches,
+                        "Instrument current" if currency.instrument_current else "Not instrument current", delta_color="off")
+
+# The whole logbook as CSV, for spreadsheets and other logbook programs
+st.download_button("Download Logbook CSV", store.export_csv(), file_name=LOGBOOK_CSV, mime="text/csv")
\ No newline at end of file
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371000  # Mean radius of the Earth in meters
+MPS_TO_KNOTS = 1.94384
+METERS_TO_FEET = 3.28084
+
+
+# Function to calculate the great-circle distance in meters between points using the Haversine formula
+# Works on scalars or whole NumPy arrays (broadcasting like any other ufunc expression)
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+# Function to calculate the distance in kilometers between points
+def haversine_km(lat1, lon1, lat2, lon2):
+    return haversine_m(lat1, lon1, lat2, lon2) / 1000
+
+# Function to calculate the initial bearing (0-360 degrees) from the first point to the second
+def bearing_deg(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360  # Normalize to 0-360 degrees
+
+# Function to calculate the time between consecutive samples in seconds (length n - 1)
+def time_deltas_s(timestamps_ns):
+    return np.diff(np.asarray(timestamps_ns, dtype=np.int64)) / 1e9
+
+# Function to calculate the distance and bearing between consecutive track points (length n - 1)
+def segment_distance_bearing(lat, lon):
+    # Convert once and share the trig terms between the distance and the bearing
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    cos_lat1, cos_lat2 = cos_lat[:-1], cos_lat[1:]
+
+    a = np.sin(dlat / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin(dlon / 2) ** 2
+    distance = 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    x = np.sin(dlon) * cos_lat2
+    y = cos_lat1 * sin_lat[1:] - sin_lat[:-1] * cos_lat2 * np.cos(dlon)
+    bearing = (np.degrees(np.arctan2(x, y)) + 360) % 360
+    return distance, bearing
+
+# Function to spread per-segment values back onto the samples (sample i gets the segment ending at i,
+# the first sample reuses the first segment)
+def _per_sample(segment_values):
+    if len(segment_values) == 0:
+        return np.full(1, np.nan)
+    return np.concatenate((segment_values[:1], segment_values))
+
+# Function to calculate ground speed (knots) and course (degrees) for every sample using the real time deltas
+def ground_speed_course(timestamps_ns, lat, lon):
+    if len(timestamps_ns) == 0:
+        return np.empty(0), np.empty(0)
+    distance, bearing = segment_distance_bearing(lat, lon)
+    dt = time_deltas_s(timestamps_ns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed_mps = np.where(dt > 0, distance / dt, np.nan)  # Duplicate timestamps give no speed
+    return _per_sample(speed_mps * MPS_TO_KNOTS), _per_sample(bearing)
+
+# Function to calculate vertical speed in feet per minute for every sample using the real time deltas
+def vertical_speed_fpm(timestamps_ns, altitude_ft):
+    if len(timestamps_ns) == 0:
+        return np.empty(0)
+    dalt = np.diff(np.asarray(altitude_ft, dtype=np.float64))
+    dt = time_deltas_s(timestamps_ns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fpm = np.where(dt > 0, dalt / dt * 60, np.nan)
+    return _per_sample(fpm)
+
+# Function to project points onto a local east/north tangent plane in meters around an origin
+# (the track's mean position by default); accurate to well under 0.1% over a few tens of kilometers
+def east_north_m(lat, lon, origin_lat=None, origin_lon=None):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    origin_lat = np.nanmean(lat) if origin_lat is None else origin_lat
+    origin_lon = np.nanmean(lon) if origin_lon is None else origin_lon
+    east = EARTH_RADIUS_M * np.radians(lon - origin_lon) * np.cos(np.radians(origin_lat))
+    north = EARTH_RADIUS_M * np.radians(lat - origin_lat)
+    return east, north
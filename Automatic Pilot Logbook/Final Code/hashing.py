@@ -0,0 +1,21 @@
+import hashlib
+
+
+# Function to hash a track file's contents, so a renamed or re-uploaded copy is still recognised
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to hash bytes already in memory (e.g. a Streamlit upload)
+def bytes_sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+# Function to combine the hashes of the parts of one flight into the flight's hash, whatever the order of
+# the parts (a single file keeps its own hash)
+def combined_sha256(content_hashes):
+    if len(content_hashes) == 1:
+        return content_hashes[0]
+    return hashlib.sha256('\n'.join(sorted(content_hashes)).encode('ascii')).hexdigest()
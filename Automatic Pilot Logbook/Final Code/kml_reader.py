@@ -0,0 +1,126 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+from collections import deque
+
+
+# Namespaces used in the ForeFlight/Stratux KML track logs
+KML_NS = '{http://www.opengis.net/kml/2.2}'
+GX_NS = '{http://www.google.com/kml/ext/2.2}'
+
+# ExtendedData fields describing the whole flight
+METADATA_FIELDS = ['source', 'GPSModelName', 'flightTitle', 'pilotName', 'tailNumber', 'pilotNotes', 'routeWaypoints']
+
+# gx:SimpleArrayData channels recorded alongside every track point
+CHANNEL_NAMES = ['acc_horiz', 'acc_vert', 'course', 'speed_kts', 'altitude', 'bank', 'pitch']
+
+# Bump whenever parsing or the derived channels change, so cached tracks are decoded again
+PARSER_VERSION = 1
+
+
+# Function to stream (timestamp, lon, lat, alt) points out of a KML track log in a single pass
+def iter_kml_track(input_kml_file, metadata=None, channels=None):
+    # ForeFlight writes the ExtendedData block after the gx:Track, so the metadata and
+    # channels dicts passed in are only complete once the generator has been exhausted
+    pending_times = deque()  # <when> values waiting for their matching <gx:coord>
+    parents = []  # Stack of open elements so finished children can be freed
+    channel_name = None
+    data_name = None
+
+    for event, elem in ET.iterparse(input_kml_file, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            if elem.tag == GX_NS + 'SimpleArrayData':
+                channel_name = elem.get('name')
+            elif elem.tag == KML_NS + 'Data':
+                data_name = elem.get('name')
+            continue
+
+        parents.pop()
+        tag = elem.tag
+        if tag == KML_NS + 'when':
+            pending_times.append(elem.text)
+        elif tag == GX_NS + 'coord':
+            lon, lat, alt = elem.text.split()
+            yield pending_times.popleft(), lon, lat, alt
+        elif tag == GX_NS + 'value':
+            if channels is not None and channel_name is not None:
+                channels.setdefault(channel_name, []).append(elem.text)
+        elif tag == KML_NS + 'value':
+            if metadata is not None and data_name is not None:
+                metadata[data_name] = elem.text
+        elif tag == GX_NS + 'SimpleArrayData':
+            channel_name = None
+            continue
+        elif tag == KML_NS + 'Data':
+            data_name = None
+            continue
+        else:
+            continue
+
+        # Free the finished element so memory stays flat on long tracks
+        if parents:
+            del parents[-1][:]
+
+
+# Function to read only the first <when> of a track log (its start time), stopping the parse there
+def read_first_timestamp(input_kml_file):
+    for event, elem in ET.iterparse(input_kml_file, events=('end',)):
+        if elem.tag == KML_NS + 'when':
+            return elem.text
+    return None
+
+# Function to read only the last <when> of a track log (its end time), stopping the parse at the end of the
+# gx:Track, before the much larger ExtendedData channels
+def read_last_timestamp(input_kml_file):
+    last_when = None
+    for event, elem in ET.iterparse(input_kml_file, events=('end',)):
+        if elem.tag == KML_NS + 'when':
+            last_when = elem.text
+        elif elem.tag == GX_NS + 'Track':
+            break
+        elem.clear()
+    return last_when
+
+# Function to convert a list of text values to a float array, using NaN for blanks or junk
+def to_float_array(values):
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return column
+
+# Function to decode a KML track log into index-aligned NumPy columns plus the flight metadata
+def read_kml_track(input_kml_file):
+    metadata = {}
+    channels = {}
+    timestamps, lons, lats, alts = [], [], [], []
+    for timestamp, lon, lat, alt in iter_kml_track(input_kml_file, metadata, channels):
+        timestamps.append(timestamp)
+        lons.append(lon)
+        lats.append(lat)
+        alts.append(alt)
+
+    columns = {
+        'timestamp': np.asarray(timestamps, dtype=str),
+        'longitude': to_float_array(lons),
+        'latitude': to_float_array(lats),
+        'altitude_m': to_float_array(alts),  # GPS altitude from gx:coord in meters
+    }
+
+    # Each SimpleArrayData channel holds one value per <when>, so it lines up with the points by index
+    num_points = len(timestamps)
+    for name in CHANNEL_NAMES:
+        values = to_float_array(channels.get(name, []))
+        if len(values) != num_points:
+            # Missing or truncated channel, pad with NaN so indexes still line up
+            padded = np.full(num_points, np.nan)
+            padded[:min(len(values), num_points)] = values[:num_points]
+            values = padded
+        columns[name] = values
+
+    return columns, metadata
@@ -0,0 +1,49 @@
+import csv
+import pandas as pd
+from kml_reader import read_kml_track, CHANNEL_NAMES, METADATA_FIELDS
+from track import parse_timestamps
+from geodesy import ground_speed_course, METERS_TO_FEET
+
+
+# The original CSV-based pipeline stages, kept only as the baseline benchmark.py measures the
+# in-memory Track pipeline against; nothing in the logbook pipeline calls them
+
+# Function to calculate speed, altitude in feet and course from a track CSV written by kml_to_csv
+def calculate_speed_altitude_course(input_csv, output_csv):
+    df = pd.read_csv(input_csv)
+    timestamps_ns = parse_timestamps(df['Timestamp'])
+
+    # Ground speed and course over the whole track at once, using the real time between samples
+    speed_knots, course = ground_speed_course(timestamps_ns, df['Latitude'].to_numpy(), df['Longitude'].to_numpy())
+    altitude_feet = df['Altitude'].to_numpy() * METERS_TO_FEET  # Convert altitude to feet
+
+    cleaned = pd.DataFrame({
+        'Timestamp': df['Timestamp'],
+        'Speed (knots)': speed_knots,
+        'Altitude (feet)': altitude_feet,
+        'Course (degrees)': course,
+        'Latitude': df['Latitude'],
+        'Longitude': df['Longitude'],
+        'TailNumber': df['TailNumber'],
+        'Source': df['Source'],
+        'GPSModelName': df['GPSModelName'],
+        'FlightTitle': df['FlightTitle']
+    })
+    # The first sample has no previous point to measure from
+    cleaned.iloc[1:].to_csv(output_csv, index=False, float_format='%.2f')
+
+# Function to extract data from KML file and save to CSV
+def kml_to_csv(input_kml_file, cleaned_csv_file):
+    columns, metadata = read_kml_track(input_kml_file)
+
+    # Prepare headers for the CSV file
+    headers = ['Timestamp', 'Longitude', 'Latitude', 'Altitude', 'Horizontal Acceleration', 'Vertical Acceleration', 'Course', 'Speed (Kts)', 'Altitude2', 'Bank', 'Pitch', 'Source', 'GPSModelName', 'FlightTitle', 'PilotName', 'TailNumber', 'PilotNotes', 'RouteWaypoints']
+    metadata_values = [metadata.get(name) for name in METADATA_FIELDS]
+
+    # Open CSV file for writing
+    with open(cleaned_csv_file, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        rows = zip(columns['timestamp'], columns['longitude'], columns['latitude'], columns['altitude_m'], *(columns[name] for name in CHANNEL_NAMES))
+        for row in rows:
+            writer.writerow(list(row) + metadata_values)
@@ -0,0 +1,407 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import sys
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+
+LOGBOOK_DB = 'pilot_logbook.sqlite'  # The logbook every entry point writes to; CSV is only for import and export
+
+# Logbook CSV header
+LOGBOOK_COLUMNS = [
+    'Date', 'Make/Model', 'Tail #', 'From', 'Route', 'To', 'Day Land', 'Night Land',
+    '# Inst App', 'Type/Location Inst App', 'Airplane Single', 'Airplane Multi', 
+    'Inst Act', 'Inst Sim/Hood', 'Inst FTD/Simulator',
+    'Night', 'Day XC (All)', 'Day XC (>50 NM)', 
+    'Night XC (All)', 'Night XC (>50 NM)', 'PIC', 'SOLO', 
+    'Ground Train Received', 'Flight Train Received', 'Flight Train Given',
+    'Total', 'Remarks'          
+]
+
+# SQL column and type for every logbook column, in LOGBOOK_COLUMNS order
+STORE_COLUMNS = [
+    ('date', 'TEXT NOT NULL'),  # ISO YYYY-MM-DD so it sorts and indexes; MM/DD/YYYY in rows and CSV
+    ('make_model', 'TEXT'),
+    ('tail_number', 'TEXT'),
+    ('from_airport', 'TEXT'),
+    ('route', 'TEXT'),
+    ('to_airport', 'TEXT'),
+    ('day_landings', 'INTEGER'),
+    ('night_landings', 'INTEGER'),
+    ('instrument_approaches', 'INTEGER'),
+    ('instrument_approach_type_location', 'TEXT'),
+    ('airplane_single', 'REAL'),
+    ('airplane_multi', 'REAL'),
+    ('instrument_actual', 'REAL'),
+    ('instrument_simulated_hood', 'REAL'),
+    ('instrument_ftd_simulator', 'REAL'),
+    ('night', 'REAL'),
+    ('day_xc_all', 'REAL'),
+    ('day_xc_50_nm', 'REAL'),
+    ('night_xc_all', 'REAL'),
+    ('night_xc_50_nm', 'REAL'),
+    ('pic', 'REAL'),
+    ('solo', 'REAL'),
+    ('ground_training_received', 'REAL'),
+    ('flight_training_received', 'REAL'),
+    ('flight_training_given', 'REAL'),
+    ('total', 'REAL'),
+    ('remarks', 'TEXT'),
+]
+COLUMN_NAMES = [name for name, _ in STORE_COLUMNS]
+NUMERIC_COLUMNS = [name for name, sql_type in STORE_COLUMNS if sql_type in ('INTEGER', 'REAL')]
+# Night landings to a full stop, the only ones that count for night currency; the CSV has no column for them,
+# so they are counted from the remarks written from the detected events ("KEET: 1 night full stop landings")
+NIGHT_FULL_STOP_PATTERN = re.compile(r'(\d+) night full stop landings')
+ROLLUP_COLUMNS = NUMERIC_COLUMNS + ['night_full_stop_landings']
+
+# One row per flight keyed by the track file's content hash (see hashing.py); artifacts is JSON, e.g. the map file
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS flights (
+    flight_id TEXT PRIMARY KEY,
+    source TEXT,
+    start_ns INTEGER,
+    {', '.join(f'{name} {sql_type}' for name, sql_type in STORE_COLUMNS)},
+    night_full_stop_landings INTEGER,
+    artifacts TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flights_date ON flights (date, start_ns);
+CREATE INDEX IF NOT EXISTS flights_tail_number ON flights (tail_number, date);
+CREATE INDEX IF NOT EXISTS flights_from_airport ON flights (from_airport, date);
+CREATE INDEX IF NOT EXISTS flights_to_airport ON flights (to_airport, date);
+"""
+
+ROLLUP_VERSION = 2  # PRAGMA user_version once the rollup tables (with every ROLLUP_COLUMNS) exist and have been filled
+CURRENCY_DAYS = 90  # Passenger currency: 3 takeoffs and landings in the preceding 90 days (at night for night currency)
+CURRENCY_LANDINGS = 3
+INSTRUMENT_CURRENCY_MONTHS = 6  # Instrument currency: 6 approaches in the preceding 6 calendar months
+INSTRUMENT_CURRENCY_APPROACHES = 6
+
+# Currency on a date; night_landings includes touch and goes, night currency only counts night_full_stop_landings
+Currency = namedtuple('Currency', ['as_of', 'day_landings', 'night_landings', 'night_full_stop_landings', 'instrument_approaches',
+                                   'passenger_current', 'night_current', 'instrument_current'])
+
+
+# Function to build the SQL that adds (sign '+') or removes (sign '-') one flight row (NEW or OLD in a trigger)
+# from a rollup table, creating the rollup row if needed
+def _rollup_change_sql(table, key_column, key_value, sign, flight):
+    columns = ['num_flights'] + ROLLUP_COLUMNS
+    values = [f'{sign}1'] + [f'{sign}IFNULL({flight}.{name}, 0)' for name in ROLLUP_COLUMNS]
+    return (f"INSERT INTO {table} ({key_column}, {', '.join(columns)}) VALUES ({key_value}, {', '.join(values)}) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET {', '.join(f'{name} = {name} + excluded.{name}' for name in columns)};")
+
+# Function to build the SQL for one flight row in both rollups: its day and the lifetime totals
+def _rollup_changes_sql(sign, flight):
+    return (_rollup_change_sql('daily_totals', 'date', f'{flight}.date', sign, flight) + '\n' +
+            _rollup_change_sql('lifetime_totals', 'id', '1', sign, flight))
+
+# Running totals per day and for the whole logbook, kept up to date by triggers, so every insert, edit or
+# delete costs two row updates and totals or currency never scan the flights
+_ROLLUP_COLUMNS = ', '.join(f'{name} REAL NOT NULL DEFAULT 0' for name in ROLLUP_COLUMNS)
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS daily_totals (date TEXT PRIMARY KEY, num_flights INTEGER NOT NULL DEFAULT 0, {_ROLLUP_COLUMNS});
+CREATE TABLE IF NOT EXISTS lifetime_totals (id INTEGER PRIMARY KEY CHECK (id = 1), num_flights INTEGER NOT NULL DEFAULT 0, {_ROLLUP_COLUMNS});
+CREATE TRIGGER IF NOT EXISTS flights_rollup_insert AFTER INSERT ON flights BEGIN
+{_rollup_changes_sql('+', 'NEW')}
+END;
+CREATE TRIGGER IF NOT EXISTS flights_rollup_delete AFTER DELETE ON flights BEGIN
+{_rollup_changes_sql('-', 'OLD')}
+END;
+CREATE TRIGGER IF NOT EXISTS flights_rollup_update AFTER UPDATE ON flights BEGIN
+{_rollup_changes_sql('-', 'OLD')}
+{_rollup_changes_sql('+', 'NEW')}
+END;
+"""
+DROP_ROLLUP_SCHEMA = """
+DROP TRIGGER IF EXISTS flights_rollup_insert;
+DROP TRIGGER IF EXISTS flights_rollup_delete;
+DROP TRIGGER IF EXISTS flights_rollup_update;
+DROP TABLE IF EXISTS daily_totals;
+DROP TABLE IF EXISTS lifetime_totals;
+"""
+
+
+# Function to count the night full stop landings in a logbook row's remarks
+def night_full_stop_landings(remarks):
+    return sum(int(count) for count in NIGHT_FULL_STOP_PATTERN.findall(remarks or ''))
+
+# Function to convert a logbook row (LOGBOOK_COLUMNS order, MM/DD/YYYY date) into store values
+def _row_to_values(row):
+    values = [value.item() if hasattr(value, 'item') else value for value in row]  # NumPy scalars from pandas
+    values = [None if value == '' else value for value in values]
+    month, day, year = str(values[0]).split('/')
+    values[0] = f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+    return values
+
+# Function to convert store values back into a logbook row
+def _values_to_row(values):
+    row = list(values)
+    year, month, day = row[0].split('-')
+    row[0] = f"{month}/{day}/{year}"
+    return row
+
+# Function to accept a date, datetime or ISO string as a query bound
+def _iso_date(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+# Logbook kept in an SQLite database in WAL mode, so readers never block the writer
+# Every call opens its own short-lived connection, which makes one store safe to share between threads
+# and processes; SQLite's locking (with a busy timeout) serializes the writers
+class LogbookStore:
+    def __init__(self, path=LOGBOOK_DB):
+        self.path = path
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')  # Persistent, recorded in the database file
+            connection.executescript(SCHEMA)
+            columns = [column[1] for column in connection.execute('PRAGMA table_info(flights)')]
+            if 'artifacts' not in columns:
+                # A database from before the flights' artifacts were kept
+                connection.execute('ALTER TABLE flights ADD COLUMN artifacts TEXT')
+            if 'night_full_stop_landings' not in columns:
+                # A database from before night full stops were kept apart from touch and goes
+                with connection:
+                    connection.execute('ALTER TABLE flights ADD COLUMN night_full_stop_landings INTEGER')
+                    remarks = connection.execute('SELECT flight_id, remarks FROM flights').fetchall()
+                    connection.executemany('UPDATE flights SET night_full_stop_landings = ? WHERE flight_id = ?',
+                                           [(night_full_stop_landings(text), flight_id) for flight_id, text in remarks])
+            rollups_outdated = connection.execute('PRAGMA user_version').fetchone()[0] < ROLLUP_VERSION
+            if rollups_outdated:
+                # A database from before the rollups existed, or with fewer rollup columns
+                connection.executescript(DROP_ROLLUP_SCHEMA)
+            connection.executescript(ROLLUP_SCHEMA)
+            if rollups_outdated:
+                with connection:
+                    self._rebuild_rollups(connection)
+                    connection.execute(f'PRAGMA user_version = {ROLLUP_VERSION}')
+        finally:
+            connection.close()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL, one fsync per checkpoint
+            with connection:  # One transaction, committed on success and rolled back on error
+                yield connection
+        finally:
+            connection.close()
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM flights').fetchone()[0]
+
+    # Function to build the SQL that writes one flight, either skipping or updating an existing one
+    def _insert_sql(self, on_conflict):
+        columns = ['flight_id', 'source', 'start_ns'] + COLUMN_NAMES + ['night_full_stop_landings', 'artifacts', 'updated_at']
+        sql = f"INSERT INTO flights ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) ON CONFLICT (flight_id) DO "
+        if on_conflict == 'nothing':
+            return sql + 'NOTHING'
+        updates = COLUMN_NAMES + ['night_full_stop_landings', 'updated_at']  # An edit keeps the artifacts of the logged flight
+        return sql + 'UPDATE SET ' + ', '.join(f"{name} = excluded.{name}" for name in updates)
+
+    def _flight_params(self, flight, updated_at):
+        artifacts = json.dumps(flight['artifacts']) if flight.get('artifacts') else None
+        values = _row_to_values(flight['row'])
+        night_full_stops = night_full_stop_landings(values[COLUMN_NAMES.index('remarks')])
+        return [flight['content_hash'], flight.get('source'), flight.get('start_ns')] + values + [night_full_stops, artifacts, updated_at]
+
+    # Function to add flights (dicts with 'content_hash', 'row' and optionally 'source', 'start_ns' and
+    # 'artifacts', as returned by analyse_track_bytes); flights already in the store are left alone
+    # Returns the flights that were added, in chronological order
+    def add_flights(self, flights):
+        sql = self._insert_sql('nothing')
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        added = []
+        with self._connect() as connection:
+            for flight in flights:
+                if connection.execute(sql, self._flight_params(flight, updated_at)).rowcount:
+                    added.append(flight)
+        return sorted(added, key=lambda flight: flight.get('start_ns') or 0)
+
+    # Function to insert or update flights by their id, e.g. rows edited in the front end
+    def upsert_flights(self, flights):
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        with self._connect() as connection:
+            connection.executemany(self._insert_sql('update'), [self._flight_params(flight, updated_at) for flight in flights])
+
+    # Function to get one logged flight as a dict like those given to add_flights, or None if it is not logged
+    def get_flight(self, flight_id):
+        query = f"SELECT source, start_ns, artifacts, {', '.join(COLUMN_NAMES)} FROM flights WHERE flight_id = ?"
+        with self._connect() as connection:
+            values = connection.execute(query, (flight_id,)).fetchone()
+        if values is None:
+            return None
+        source, start_ns, artifacts = values[:3]
+        return {'content_hash': flight_id, 'source': source, 'start_ns': start_ns, 'row': _values_to_row(values[3:]),
+                'artifacts': json.loads(artifacts) if artifacts else {}}
+
+    # Function to find which of the given flight ids are already in the store
+    def known_flights(self, flight_ids, chunk_size=500):
+        flight_ids = list(flight_ids)
+        known = set()
+        with self._connect() as connection:
+            for start in range(0, len(flight_ids), chunk_size):
+                chunk = flight_ids[start:start + chunk_size]
+                query = f"SELECT flight_id FROM flights WHERE flight_id IN ({', '.join('?' * len(chunk))})"
+                known.update(flight_id for flight_id, in connection.execute(query, chunk))
+        return known
+
+    # Function to build the WHERE clause for the date range, tail number and airport filters
+    # An airport matches as the departure, the destination or a stop on the route
+    def _where(self, start_date=None, end_date=None, tail_number=None, airport=None):
+        clauses, params = [], []
+        if start_date is not None:
+            clauses.append('date >= ?')
+            params.append(_iso_date(start_date))
+        if end_date is not None:
+            clauses.append('date <= ?')
+            params.append(_iso_date(end_date))
+        if tail_number is not None:
+            clauses.append('tail_number = ?')
+            params.append(tail_number)
+        if airport is not None:
+            clauses.append("(from_airport = ? OR to_airport = ? OR ' - ' || route || ' - ' LIKE ?)")
+            params.extend([airport, airport, f"% - {airport} - %"])
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    # Function to get logbook rows (LOGBOOK_COLUMNS order) in chronological order, optionally filtered
+    def rows(self, start_date=None, end_date=None, tail_number=None, airport=None, limit=None):
+        where, params = self._where(start_date, end_date, tail_number, airport)
+        order = 'ASC' if limit is None else 'DESC'  # With a limit, the most recent flights
+        query = f"SELECT {', '.join(COLUMN_NAMES)} FROM flights{where} ORDER BY date {order}, start_ns {order}, rowid {order}"
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._connect() as connection:
+            rows = [_values_to_row(values) for values in connection.execute(query, params)]
+        return rows if limit is None else rows[::-1]
+
+    # Function to sum every numeric logbook column, optionally filtered; returns {logbook column: total}
+    # plus 'Flights' for the number of flights
+    # Without filters this reads the lifetime rollup and with only dates the daily rollups; tail number and
+    # airport filters sum the matching flights through their indexes
+    def totals(self, start_date=None, end_date=None, tail_number=None, airport=None):
+        sums = ', '.join(f'TOTAL({name})' for name in NUMERIC_COLUMNS)
+        if tail_number is None and airport is None:
+            where, params = self._where(start_date, end_date)
+            table = 'lifetime_totals' if not params else 'daily_totals'
+            query = f"SELECT TOTAL(num_flights), {sums} FROM {table}{where}"
+        else:
+            where, params = self._where(start_date, end_date, tail_number, airport)
+            query = f"SELECT COUNT(*), {sums} FROM flights{where}"
+        with self._connect() as connection:
+            values = list(connection.execute(query, params).fetchone())
+        values[0] = int(values[0])
+        labels = [LOGBOOK_COLUMNS[COLUMN_NAMES.index(name)] for name in NUMERIC_COLUMNS]
+        return dict(zip(['Flights'] + labels, values))
+
+    # Function to get passenger, night and instrument currency on a date (default today) from the daily rollups
+    # Both windows are given by the day before they start (dates after it count): the 90 days ending on as_of,
+    # and the 6 calendar months before as_of's month plus that month so far
+    def currency(self, as_of=None):
+        as_of = datetime.strptime(_iso_date(as_of or date.today()), '%Y-%m-%d').date()
+        landings_after = as_of - timedelta(days=CURRENCY_DAYS)
+        month = as_of.year * 12 + as_of.month - 1 - INSTRUMENT_CURRENCY_MONTHS
+        approaches_after = date(month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        query = ("SELECT TOTAL(CASE WHEN date > :landings_after THEN day_landings END), "
+                 "TOTAL(CASE WHEN date > :landings_after THEN night_landings END), "
+                 "TOTAL(CASE WHEN date > :landings_after THEN night_full_stop_landings END), "
+                 "TOTAL(CASE WHEN date > :approaches_after THEN instrument_approaches END) "
+                 "FROM daily_totals WHERE date > :earliest AND date <= :as_of")
+        params = {'landings_after': _iso_date(landings_after), 'approaches_after': _iso_date(approaches_after),
+                  'earliest': _iso_date(min(landings_after, approaches_after)), 'as_of': _iso_date(as_of)}
+        with self._connect() as connection:
+            day_landings, night_landings, night_full_stops, approaches = (int(value) for value in connection.execute(query, params).fetchone())
+        # Night currency (14 CFR 61.57(b)) needs the landings to a full stop
+        return Currency(as_of, day_landings, night_landings, night_full_stops, approaches,
+                        day_landings + night_landings >= CURRENCY_LANDINGS, night_full_stops >= CURRENCY_LANDINGS,
+                        approaches >= INSTRUMENT_CURRENCY_APPROACHES)
+
+    # Function to recompute the rollups from the flights, e.g. after editing the database by hand
+    def rebuild_rollups(self):
+        with self._connect() as connection:
+            self._rebuild_rollups(connection)
+
+    def _rebuild_rollups(self, connection):
+        columns = ', '.join(['num_flights'] + ROLLUP_COLUMNS)
+        sums = ', '.join(['COUNT(*)'] + [f'TOTAL({name})' for name in ROLLUP_COLUMNS])
+        connection.execute('DELETE FROM daily_totals')
+        connection.execute('DELETE FROM lifetime_totals')
+        connection.execute(f"INSERT INTO daily_totals (date, {columns}) SELECT date, {sums} FROM flights GROUP BY date")
+        connection.execute(f"INSERT INTO lifetime_totals (id, {columns}) SELECT 1, {sums} FROM flights")
+
+    # Function to import a logbook CSV; rows get an id from their contents, so importing the same file
+    # twice adds nothing. Returns the number of flights added
+    def import_csv(self, csv_file):
+        with open(csv_file, newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Header
+            flights = [
+                {'content_hash': 'csv-' + hashlib.sha256('\x1f'.join(row).encode('utf-8')).hexdigest(), 'source': csv_file, 'row': row}
+                for row in reader if row
+            ]
+        return len(self.add_flights(flights))
+
+    # Function to export the logbook (optionally filtered) as CSV to a file, or return it as text
+    def export_csv(self, csv_file=None, **filters):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(LOGBOOK_COLUMNS)
+        writer.writerows(self.rows(**filters))
+        if csv_file is None:
+            return buffer.getvalue()
+        with open(csv_file, 'w', newline='') as file:
+            file.write(buffer.getvalue())
+
+
+# Command line: python logbook_store.py import pilot_logbook.csv / export out.csv / totals --airport KEET / currency
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import, export and total the SQLite pilot logbook.')
+    parser.add_argument('command', choices=['import', 'export', 'totals', 'currency', 'rebuild'])
+    parser.add_argument('csv_file', nargs='?', help='CSV file to import from or export to (export defaults to stdout)')
+    parser.add_argument('--database', default=LOGBOOK_DB)
+    parser.add_argument('--from', dest='start_date', help='First date to include (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_date', help='Last date to include (YYYY-MM-DD)')
+    parser.add_argument('--tail-number')
+    parser.add_argument('--airport')
+    args = parser.parse_args(argv)
+    store = LogbookStore(args.database)
+    filters = {'start_date': args.start_date, 'end_date': args.end_date, 'tail_number': args.tail_number, 'airport': args.airport}
+
+    if args.command == 'import':
+        if not args.csv_file:
+            parser.error('import needs a CSV file')
+        print(f"Imported {store.import_csv(args.csv_file)} flights into {args.database}")
+    elif args.command == 'export':
+        if args.csv_file:
+            store.export_csv(args.csv_file, **filters)
+        else:
+            sys.stdout.write(store.export_csv(**filters))
+    elif args.command == 'totals':
+        for label, total in store.totals(**filters).items():
+            print(f"{label}: {round(total, 1)}")
+    elif args.command == 'currency':
+        currency = store.currency(args.end_date)
+        print(f"As of {currency.as_of}: {currency.day_landings} day and {currency.night_landings} night landings"
+              f" ({currency.night_full_stop_landings} night full stops) in {CURRENCY_DAYS} days,"
+              f" {currency.instrument_approaches} approaches in {INSTRUMENT_CURRENCY_MONTHS} months")
+        print(f"Passenger current: {currency.passenger_current}, night current: {currency.night_current},"
+              f" instrument current: {currency.instrument_current}")
+    else:
+        store.rebuild_rollups()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
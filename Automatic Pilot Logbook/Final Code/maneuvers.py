@@ -0,0 +1,95 @@
+from collections import namedtuple
+import numpy as np
+
+
+STEEP_TURN_DEGREES = 345  # A full circle, allowing for a slightly early roll-out
+STEEP_TURN_MIN_S = 15
+STEEP_TURN_MAX_S = 30
+MIN_TURN_RATE_DEG_S = 5  # Slower heading changes are straight flight or noise
+MIN_TURN_SPEED_KTS = 45  # Course is meaningless while taxiing or stopped
+GRAVITY_MPS2 = 9.80665
+KNOTS_TO_MPS = 0.514444
+
+# One steep turn; bank is the coordinated-turn bank for the average speed and turn rate (the recorded
+# bank channel is the device attitude, which depends on how it is mounted)
+SteepTurn = namedtuple('SteepTurn', ['start_index', 'end_index', 'start_ns', 'end_ns', 'duration_s', 'direction',
+                                     'heading_change_deg', 'bank_deg', 'altitude_deviation_ft'])
+
+
+# Function to fill NaN values with the last valid value before them (leading NaNs take the first valid value)
+def _fill_forward(values):
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.zeros(len(values))
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(values)), 0))
+    filled = values[last_valid]
+    filled[:np.argmax(valid)] = values[np.argmax(valid)]
+    return filled
+
+# Function to split turning into laps of 345 degrees of heading change
+# Consecutive turning segments (segment k runs from sample k to k + 1) turning the same way form a run;
+# each 345 degrees inside a run is one lap (so a 720 degree orbit is two), timed from where the previous
+# lap ended. Returns (start_indexes, end_indexes) of the laps as sample indexes
+def _turn_laps(heading, turning):
+    heading_change = np.diff(heading)
+    direction = np.sign(heading_change)
+    continues = turning[:-1] & turning[1:] & (direction[:-1] == direction[1:])
+    run_start_segments = np.flatnonzero(turning & ~np.concatenate(([False], continues)))
+    run_end_samples = np.flatnonzero(turning & ~np.concatenate((continues, [False]))) + 1
+
+    # Degrees turned so far (never decreases), so every lap boundary is a searchsorted lookup
+    turned = np.concatenate(([0], np.cumsum(np.where(turning, np.abs(heading_change), 0))))
+    run_base = turned[run_start_segments]
+    laps = np.floor((turned[run_end_samples] - run_base) / STEEP_TURN_DEGREES).astype(np.int64)
+    lap_run = np.repeat(np.arange(len(laps)), laps)
+    lap_number = np.arange(len(lap_run)) - np.repeat(np.cumsum(laps) - laps, laps) + 1
+    end_indexes = np.searchsorted(turned, run_base[lap_run] + lap_number * STEEP_TURN_DEGREES)
+
+    # The first lap starts where the run starts, later laps where the previous lap ended
+    start_indexes = np.where(lap_number == 1, run_start_segments[lap_run], np.concatenate(([0], end_indexes[:-1])))
+    return start_indexes, end_indexes
+
+# Function to find every 345+ degree turn completed in 15-30 seconds using the unwrapped heading
+# Segments turning at 5+ deg/s above 45 knots count as turning
+def find_steep_turns(track):
+    timestamps_ns = track.timestamps_ns
+    if len(timestamps_ns) < 2:
+        return []
+    heading = np.degrees(np.unwrap(np.radians(_fill_forward(track.course))))  # No jump at 359 -> 0
+    dt_s = np.diff(timestamps_ns) / 1e9
+    speed = np.asarray(track.speed_kts, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turn_rate = np.where(dt_s > 0, np.diff(heading) / dt_s, 0)
+    turning = (np.abs(turn_rate) >= MIN_TURN_RATE_DEG_S) & (speed[1:] >= MIN_TURN_SPEED_KTS)
+    start_indexes, end_indexes = _turn_laps(heading, turning)
+
+    # Keep the ones completed in 15-30 seconds
+    durations_s = (timestamps_ns[end_indexes] - timestamps_ns[start_indexes]) / 1e9
+    steep = (durations_s >= STEEP_TURN_MIN_S) & (durations_s <= STEEP_TURN_MAX_S)
+    start_indexes, end_indexes, durations_s = start_indexes[steep], end_indexes[steep], durations_s[steep]
+    if len(end_indexes) == 0:
+        return []
+
+    # Per-turn quality figures from one reduceat over each [start, end] slice
+    bounds = np.ravel(np.column_stack((start_indexes, end_indexes + 1)))
+    altitude = np.asarray(track.altitude_ft, dtype=np.float64)
+    altitude = np.append(altitude, altitude[-1])  # reduceat needs the closing bound to be a valid index
+    entry_altitude = altitude[start_indexes]
+    highest = np.maximum.reduceat(altitude, bounds)[::2]
+    lowest = np.minimum.reduceat(altitude, bounds)[::2]
+    altitude_deviation = np.maximum(highest - entry_altitude, entry_altitude - lowest)
+
+    # tan(bank) = v * turn rate / g
+    heading_changes = heading[end_indexes] - heading[start_indexes]
+    mean_speed_mps = np.add.reduceat(np.append(speed, 0), bounds)[::2] / (end_indexes + 1 - start_indexes) * KNOTS_TO_MPS
+    bank = np.degrees(np.arctan(mean_speed_mps * np.radians(np.abs(heading_changes) / durations_s) / GRAVITY_MPS2))
+
+    turns = []
+    for k in range(len(end_indexes)):
+        start, end = int(start_indexes[k]), int(end_indexes[k])
+        turns.append(SteepTurn(start, end, int(timestamps_ns[start]), int(timestamps_ns[end]), float(durations_s[k]),
+                               'right' if heading_changes[k] > 0 else 'left', float(heading_changes[k]),
+                               float(bank[k]), float(altitude_deviation[k])))
+    return turns
@@ -0,0 +1,91 @@
+import math
+import numpy as np
+import folium
+from folium.plugins import MarkerCluster
+from branca.element import MacroElement
+from jinja2 import Template
+from airports import KM_PER_DEGREE
+from simplify import level_of_detail, MAP_TOLERANCES_M
+
+
+METERS_PER_PIXEL_ZOOM_0 = 156543.03  # Web Mercator ground resolution at the equator, zoom level 0
+AIRPORT_MARGIN_KM = 20  # Airports this far outside the track's bounding box are still shown
+
+
+# Leaflet script that shows one layer per zoom range: the first layer whose max zoom is at or above
+# the current zoom is on the map, every other one is removed
+class ZoomLevels(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var map = {{ this._parent.get_name() }};
+            var levels = [{% for max_zoom, layer in this.levels %}[{{ max_zoom }}, {{ layer.get_name() }}],{% endfor %}];
+            function showLevel() {
+                var zoom = map.getZoom();
+                var shown = false;
+                levels.forEach(function (level) {
+                    var show = !shown && zoom <= level[0];
+                    shown = shown || show;
+                    if (show) { map.addLayer(level[1]); } else { map.removeLayer(level[1]); }
+                });
+            }
+            map.on('zoomend', showLevel);
+            showLevel();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, levels):
+        super().__init__()
+        self._name = 'ZoomLevels'
+        self.levels = levels
+
+
+# Function to get the highest zoom level at which one screen pixel still covers tolerance_m meters
+def max_zoom_for_tolerance(tolerance_m, latitude):
+    meters_per_pixel = METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude))
+    return math.floor(math.log2(meters_per_pixel / tolerance_m))
+
+# Function to draw the flight path as one simplified polyline per tolerance, each shown only while its
+# error is smaller than a pixel, so the map embeds a few thousand points instead of every sample
+# keep lists sample indexes that every level must pass through (landings, steep-turn entries)
+def add_flight_path(flight_map, latitude, longitude, keep=None, tolerances_m=MAP_TOLERANCES_M, **line_options):
+    tolerances_m = sorted(tolerances_m, reverse=True)
+    middle_latitude = float(latitude[len(latitude) // 2])
+    levels = []
+    for k, indexes in enumerate(level_of_detail(latitude, longitude, keep, tolerances_m)):
+        layer = folium.FeatureGroup(name=f"Flight path ({tolerances_m[k]:g} m)", control=False)
+        path = list(zip(latitude[indexes].tolist(), longitude[indexes].tolist()))
+        folium.PolyLine(path, **line_options).add_to(layer)
+        layer.add_to(flight_map)
+        finest = k == len(tolerances_m) - 1
+        levels.append((99 if finest else max_zoom_for_tolerance(tolerances_m[k], middle_latitude), layer))
+    ZoomLevels(levels).add_to(flight_map)
+    return levels
+
+# Function to add clustered markers for the airports around the track (its bounding box plus a margin),
+# labelled with the landings and low passes flown there; returns the airport indexes shown
+def add_airport_markers(flight_map, airport_db, latitude, longitude, landings=None, low_passes=None, margin_km=AIRPORT_MARGIN_KM):
+    landings = landings or {}
+    low_passes = low_passes or {}
+    margin_lat = margin_km / KM_PER_DEGREE
+    max_abs_lat = min(float(np.nanmax(np.abs(latitude))) + margin_lat, 89.9)
+    margin_lon = margin_km / (KM_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+    airport_indexes = airport_db.index.within_box(np.nanmin(latitude) - margin_lat, np.nanmax(latitude) + margin_lat,
+                                                  np.nanmin(longitude) - margin_lon, np.nanmax(longitude) + margin_lon)
+
+    records = airport_db.records
+    cluster = MarkerCluster(name='Airports', control=False).add_to(flight_map)
+    for i in airport_indexes.tolist():
+        airport_id = str(records['ident'][i])
+        num_landings = landings.get(airport_id, 0)
+        num_low_passes = low_passes.get(airport_id, 0)
+        label = f"{airport_id} - {records['name'][i]}"
+        if num_landings:
+            label += f" | {num_landings} landings"
+        if num_low_passes:
+            label += f" | {num_low_passes} low passes"
+        color = 'green' if num_landings else 'orange' if num_low_passes else 'red'
+        folium.Marker(location=(float(records['latitude'][i]), float(records['longitude'][i])), tooltip=label,
+                      icon=folium.Icon(color=color, icon='plane')).add_to(cluster)
+    return airport_indexes
@@ -0,0 +1,149 @@
+from collections import namedtuple
+import contextlib
+import contextvars
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import time
+
+
+PROFILE_DIR = 'profiles'  # Per-run JSON reports
+PROFILE_TOP_FUNCTIONS = 30  # Functions kept from a cProfile capture, by cumulative time
+
+# One timed stage; name is the path of nested stages (e.g. 'create_flight_path_map/classify_light')
+StageTiming = namedtuple('StageTiming', ['name', 'wall_s', 'cpu_s', 'points'])
+
+# The profiler of the run in progress in this thread (None when profiling is off)
+_active_profiler = contextvars.ContextVar('active_profiler', default=None)
+
+
+# Stage handle yielded by stage(); set .points inside the block when the count is only known there
+class _Stage:
+    __slots__ = ('points',)
+
+    def __init__(self, points=None):
+        self.points = points
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+# Shared do-nothing stage, so a disabled profiler costs one context variable lookup per stage
+_NO_STAGE = _Stage()
+
+
+# Collects wall and CPU time per pipeline stage, counters (e.g. cache hits) and optionally a cProfile capture
+class Profiler:
+    def __init__(self, capture_cprofile=False):
+        self.capture_cprofile = capture_cprofile
+        self.stages = []  # StageTimings in the order the stages finished
+        self.counters = {}
+        self._path = []
+        self._profile = None
+        self._wall_s = self._cpu_s = 0.0
+
+    # Function to make this the active profiler for the block, timing the whole run
+    @contextlib.contextmanager
+    def activate(self):
+        token = _active_profiler.set(self)
+        if self.capture_cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            self._wall_s += time.perf_counter() - start_wall
+            self._cpu_s += time.process_time() - start_cpu
+            if self._profile is not None:
+                self._profile.disable()
+            _active_profiler.reset(token)
+
+    # Function to time a block as a stage (see the module-level stage())
+    @contextlib.contextmanager
+    def stage(self, name, points=None):
+        handle = _Stage(points)
+        self._path.append(name)
+        stage_name = '/'.join(self._path)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield handle
+        finally:
+            self.stages.append(StageTiming(stage_name, time.perf_counter() - start_wall, time.process_time() - start_cpu, handle.points))
+            self._path.pop()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Function to summarize the run as a JSON-ready dict
+    def report(self, **details):
+        stages = []
+        for timing in self.stages:
+            stages.append({
+                'name': timing.name,
+                'wall_s': round(timing.wall_s, 6),
+                'cpu_s': round(timing.cpu_s, 6),
+                'points': timing.points,
+                'points_per_second': round(timing.points / timing.wall_s) if timing.points and timing.wall_s > 0 else None,
+            })
+        report = dict(details, created=datetime.datetime.now().isoformat(timespec='seconds'),
+                      wall_s=round(self._wall_s, 6), cpu_s=round(self._cpu_s, 6), stages=stages, counters=dict(self.counters))
+        if self._profile is not None:
+            report['cprofile'] = top_functions(self._profile)
+        return report
+
+
+# Function to time a block as a stage of the active run; does nothing (beyond the lookup) when profiling is off
+# Usage: with profiling.stage('parse_kml') as stage: track = ...; stage.points = len(track)
+def stage(name, points=None):
+    profiler = _active_profiler.get()
+    return _NO_STAGE if profiler is None else profiler.stage(name, points)
+
+# Function to add to a counter of the active run (e.g. 'track_cache_hits')
+def count(name, amount=1):
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        profiler.count(name, amount)
+
+# Function to activate a profiler for a block, or do nothing when it is None
+def activated(profiler):
+    return contextlib.nullcontext() if profiler is None else profiler.activate()
+
+# Function to make a profiler from main()'s profile argument: False/None (off), True, 'cprofile' or a Profiler
+def make_profiler(profile):
+    if not profile:
+        return None
+    if isinstance(profile, Profiler):
+        return profile
+    return Profiler(capture_cprofile=profile == 'cprofile')
+
+# Function to list the functions of a cProfile capture with the most cumulative time
+def top_functions(profile, limit=PROFILE_TOP_FUNCTIONS):
+    stats = pstats.Stats(profile)
+    stats.sort_stats('cumulative')
+    functions = []
+    for key in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_s, cumulative_s, _ = stats.stats[key]
+        file_name, line, function = key
+        functions.append({
+            'function': f"{os.path.basename(file_name)}:{line}({function})" if line else function,
+            'calls': calls,
+            'total_s': round(total_s, 6),
+            'cumulative_s': round(cumulative_s, 6),
+        })
+    return functions
+
+# Function to write a report as JSON, by default as profiles/profile_<date>-<time>-<microseconds>_<hash>.json
+# Returns the file written
+def write_report(report, report_file=None, profile_dir=PROFILE_DIR):
+    if report_file is None:
+        os.makedirs(profile_dir, exist_ok=True)
+        name = f"profile_{datetime.datetime.now():%Y%m%d-%H%M%S-%f}_{(report.get('content_hash') or 'run')[:12]}.json"
+        report_file = os.path.join(profile_dir, name)
+    with open(report_file, 'w') as file:
+        json.dump(report, file, indent=2)
+    return report_file
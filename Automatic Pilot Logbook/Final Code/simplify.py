@@ -0,0 +1,60 @@
+import numpy as np
+from geodesy import east_north_m
+
+
+# Ramer-Douglas-Peucker tolerances for the map layers, coarsest first
+MAP_TOLERANCES_M = (100, 25, 5)
+
+
+# Function to calculate the distance from every point to the segment a-b (local east/north meters)
+def _segment_distance_m(x, y, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(x - ax, y - ay)
+    t = np.clip(((x - ax) * dx + (y - ay) * dy) / length_sq, 0, 1)
+    return np.hypot(x - (ax + t * dx), y - (ay + t * dy))
+
+# Function to rank every point of a track by its Ramer-Douglas-Peucker significance in meters
+# A point survives simplification at tolerance t exactly when its significance is greater than t, so one
+# pass serves every level of detail. The first and last points and the keep indexes (e.g. landings) are
+# never dropped (infinite significance) and the track is split at them; points that only matter below
+# min_tolerance_m get 0
+def rdp_significance(latitude, longitude, keep=None, min_tolerance_m=1.0):
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    num_points = len(latitude)
+    significance = np.zeros(num_points)
+    if num_points == 0:
+        return significance
+    x, y = east_north_m(latitude, longitude)
+
+    anchors = np.asarray([0, num_points - 1] + ([] if keep is None else list(keep)), dtype=np.int64)
+    anchors = np.unique(anchors[(anchors >= 0) & (anchors < num_points)])
+    significance[anchors] = np.inf
+
+    # Each pending segment carries the significance of the split that created it; a point can never be
+    # more significant than its parent, which keeps the levels nested
+    pending = [(int(start), int(end), np.inf) for start, end in zip(anchors[:-1], anchors[1:]) if end - start > 1]
+    while pending:
+        start, end, parent = pending.pop()
+        distances = _segment_distance_m(x[start + 1:end], y[start + 1:end], x[start], y[start], x[end], y[end])
+        farthest = int(np.argmax(distances))
+        if not distances[farthest] > min_tolerance_m:
+            continue
+        split = start + 1 + farthest
+        significance[split] = min(distances[farthest], parent)
+        if split - start > 1:
+            pending.append((start, split, significance[split]))
+        if end - split > 1:
+            pending.append((split, end, significance[split]))
+    return significance
+
+# Function to get the indexes of the points kept at a tolerance in meters, in track order
+def simplify_indexes(significance, tolerance_m):
+    return np.flatnonzero(significance > tolerance_m)
+
+# Function to simplify a track into one index array per tolerance (coarsest first)
+def level_of_detail(latitude, longitude, keep=None, tolerances_m=MAP_TOLERANCES_M):
+    significance = rdp_significance(latitude, longitude, keep, min_tolerance_m=min(tolerances_m))
+    return [simplify_indexes(significance, tolerance_m) for tolerance_m in tolerances_m]
@@ -0,0 +1,29 @@
+from collections import deque
+import numpy as np
+
+
+# Function to calculate, for every sample i, the minimum value over the samples from i up to
+# timestamps_ns[i] + window_ns (inclusive), using a monotonic deque so the whole track is O(N)
+# NaN values never win the minimum, the same way a NaN never passes a "speed < x" check
+def forward_window_min(timestamps_ns, values, window_ns):
+    times = np.asarray(timestamps_ns, dtype=np.int64).tolist()
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isnan(values), np.inf, values).tolist()
+    num_points = len(times)
+    window_min = np.full(num_points, np.inf)
+
+    candidates = deque()  # Indexes in the window with strictly increasing values, front is the minimum
+    right = 0  # First index not yet pushed into the window
+    for i in range(num_points):
+        end_time = times[i] + window_ns
+        right = max(right, i)  # Out-of-order timestamps can leave the window behind the sample itself
+        while right < num_points and times[right] <= end_time:
+            while candidates and values[candidates[-1]] >= values[right]:
+                candidates.pop()
+            candidates.append(right)
+            right += 1
+        while candidates and candidates[0] < i:
+            candidates.popleft()
+        if candidates:
+            window_min[i] = values[candidates[0]]
+    return window_min
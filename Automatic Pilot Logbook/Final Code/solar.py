@@ -0,0 +1,96 @@
+import numpy as np
+
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# Sunrise/sunset is when the sun's upper limb touches the horizon (refraction + semi-diameter)
+SUNRISE_ZENITH_DEG = 90.833
+
+# Light conditions for each sample
+DAY = 0
+NIGHT = 1  # Between sunset and sunrise, counts as night flight time
+NIGHT_LANDING = 2  # More than 1 hour after sunset or before sunrise, landings count as night landings
+NIGHT_LANDING_BUFFER_NS = NS_PER_HOUR
+
+
+# Function to calculate sunrise and sunset (epoch ns, UTC) of the local day each sample falls in
+# NOAA solar calculator equations evaluated on whole arrays at once
+# Returns (sunrise_ns, sunset_ns, polar) where polar is +1 for midnight sun, -1 for polar night, 0 otherwise
+def sunrise_sunset_ns(timestamps_ns, latitude, longitude):
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+
+    # Local mean solar date of each sample, so an evening flight belongs to that day's sunset
+    local_ns = timestamps_ns + (longitude / 15 * NS_PER_HOUR).astype(np.int64)
+    day_start_ns = np.floor_divide(local_ns, NS_PER_DAY) * NS_PER_DAY  # UTC midnight of the local date
+
+    # Evaluate the sun's position at local solar noon, then refine once at the sunrise and sunset times
+    noon_day = day_start_ns / NS_PER_DAY + 0.5 - longitude / 360
+    hour_angle, _, polar = _sunrise_hour_angle(noon_day, latitude)
+    rise_angle, rise_eq_of_time, _ = _sunrise_hour_angle(noon_day - hour_angle / 360, latitude)
+    set_angle, set_eq_of_time, _ = _sunrise_hour_angle(noon_day + hour_angle / 360, latitude)
+
+    sunrise_min = 720 - 4 * longitude - rise_eq_of_time - 4 * rise_angle  # Minutes after UTC midnight
+    sunset_min = 720 - 4 * longitude - set_eq_of_time + 4 * set_angle
+    sunrise_ns = day_start_ns + (sunrise_min * NS_PER_MINUTE).astype(np.int64)
+    sunset_ns = day_start_ns + (sunset_min * NS_PER_MINUTE).astype(np.int64)
+    return sunrise_ns, sunset_ns, polar
+
+# Function to calculate the sunrise hour angle (degrees) and equation of time (minutes) at the given
+# time (days since the Unix epoch, UTC) from the NOAA solar position equations
+def _sunrise_hour_angle(epoch_days, latitude):
+    jc = (UNIX_EPOCH_JULIAN_DAY + epoch_days - 2451545) / 36525  # Julian century
+
+    mean_long = np.mod(280.46646 + jc * (36000.76983 + jc * 0.0003032), 360)  # Degrees
+    mean_anom = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)  # Degrees
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    anom_rad = np.radians(mean_anom)
+    eq_of_center = (np.sin(anom_rad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                    + np.sin(2 * anom_rad) * (0.019993 - 0.000101 * jc)
+                    + np.sin(3 * anom_rad) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = mean_long + eq_of_center - 0.00569 - 0.00478 * np.sin(omega)
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliq) * np.sin(np.radians(apparent_long)))
+
+    # Equation of time in minutes
+    var_y = np.tan(obliq / 2) ** 2
+    long_rad = np.radians(mean_long)
+    eq_of_time = 4 * np.degrees(var_y * np.sin(2 * long_rad)
+                                - 2 * eccent * np.sin(anom_rad)
+                                + 4 * eccent * var_y * np.sin(anom_rad) * np.cos(2 * long_rad)
+                                - 0.5 * var_y ** 2 * np.sin(4 * long_rad)
+                                - 1.25 * eccent ** 2 * np.sin(2 * anom_rad))
+
+    # Outside [-1, 1] the sun never sets (midnight sun) or never rises (polar night)
+    lat_rad = np.radians(latitude)
+    cos_hour_angle = (np.cos(np.radians(SUNRISE_ZENITH_DEG)) / (np.cos(lat_rad) * np.cos(declination))
+                      - np.tan(lat_rad) * np.tan(declination))
+    polar = np.where(cos_hour_angle < -1, 1, np.where(cos_hour_angle > 1, -1, 0))
+    hour_angle = np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1)))
+    return hour_angle, eq_of_time, polar
+
+# Function to classify every sample as DAY, NIGHT or NIGHT_LANDING in one array operation
+def classify_light(timestamps_ns, latitude, longitude):
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    sunrise_ns, sunset_ns, polar = sunrise_sunset_ns(timestamps_ns, latitude, longitude)
+
+    night = (timestamps_ns < sunrise_ns) | (timestamps_ns > sunset_ns)
+    night_landing = (timestamps_ns < sunrise_ns - NIGHT_LANDING_BUFFER_NS) | (timestamps_ns > sunset_ns + NIGHT_LANDING_BUFFER_NS)
+    night = np.where(polar == 0, night, polar < 0)
+    night_landing = np.where(polar == 0, night_landing, polar < 0)
+
+    light = np.full(len(timestamps_ns), DAY, dtype=np.int8)
+    light[night] = NIGHT
+    light[night_landing] = NIGHT_LANDING
+    return light
+
+# Function to total the night flight time in hours as a masked sum of segment durations
+def night_time_hours(timestamps_ns, light):
+    durations_ns = np.diff(np.asarray(timestamps_ns, dtype=np.int64))
+    return durations_ns[np.asarray(light)[:-1] >= NIGHT].sum() / NS_PER_HOUR
@@ -0,0 +1,147 @@
+import os
+import re
+import numpy as np
+from kml_reader import read_first_timestamp, read_last_timestamp
+from hashing import file_sha256
+from track import Track, parse_timestamps
+from track_cache import load_track, load_track_timestamps
+import profiling
+
+
+# ForeFlight splits long recordings into TrackLog_<id>-<YYYY.MM.DD>-partNN.kml files
+PART_PATTERN = re.compile(r'^(.*)-(\d{4}\.\d{2}\.\d{2})-part(\d+)\.kml$', re.IGNORECASE)
+DUPLICATE_SAMPLE_NS = 500_000_000  # Samples from two parts closer than this are the same moment recorded twice
+MAX_PART_GAP_NS = 10 * 60 * 10**9  # Parts of different recordings closer than this (numbers running on) are one flight
+DERIVED_CHANNELS = ['ground_speed_kts', 'ground_course', 'vertical_speed_fpm']
+
+
+# Function to get a track file's start time from its first <when>
+def first_timestamp_ns(track_file):
+    return int(parse_timestamps([read_first_timestamp(track_file)])[0])
+
+# Function to get a track file's end time from its last <when>
+def last_timestamp_ns(track_file):
+    return int(parse_timestamps([read_last_timestamp(track_file)])[0])
+
+# Function to put the parts of one recording in time order
+def order_track_parts(track_files):
+    return sorted(track_files, key=first_timestamp_ns) if len(track_files) > 1 else list(track_files)
+
+# Function to group track files into flights, each a list of files in time order
+# Parts of one recording (the same id, date and directory) are ordered by their first timestamp (read without
+# parsing the whole file); a part number that does not go up starts a new recording session. ForeFlight can
+# also give the parts of one flight different ids, so a session whose part numbers run on from the previous
+# one's and that starts within MAX_PART_GAP_NS of its last timestamp continues that flight
+def group_track_parts(track_files):
+    flights = []
+    days = {}
+    for track_file in track_files:
+        match = PART_PATTERN.search(os.path.basename(track_file))
+        if match is None:
+            flights.append([track_file])
+            continue
+        recording_id, date, part_number = match.groups()
+        day = (os.path.dirname(os.path.abspath(track_file)), date)
+        days.setdefault(day, {}).setdefault(recording_id, []).append((first_timestamp_ns(track_file), int(part_number), track_file))
+
+    for recordings in days.values():
+        sessions = []
+        for parts in recordings.values():
+            session = []
+            for part in sorted(parts):
+                if session and part[1] <= session[-1][1]:
+                    sessions.append(session)
+                    session = []
+                session.append(part)
+            sessions.append(session)
+
+        sessions.sort()
+        flight = sessions[0]
+        for session in sessions[1:]:
+            _, last_part_number, last_file = flight[-1]
+            start_ns, part_number, _ = session[0]
+            if part_number > last_part_number and start_ns - last_timestamp_ns(last_file) <= MAX_PART_GAP_NS:
+                flight.extend(session)
+            else:
+                flights.append([track_file for _, _, track_file in flight])
+                flight = session
+        flights.append([track_file for _, _, track_file in flight])
+    return sorted(flights)
+
+# Function to merge the parts' timestamps, part by part (parts in time order, see order_track_parts)
+# Returns, per part, the indexes of its samples that are kept and their positions in the stitched track;
+# a sample at or before an earlier sample of its own part, or within DUPLICATE_SAMPLE_NS of a sample kept from
+# an earlier part, is overlap and dropped. Only the overlapping time ranges need a lookup, so every check is
+# vectorised with searchsorted against the samples kept so far
+def merge_part_timestamps(part_timestamps):
+    kept_rows = []
+    kept_times = []
+    merged = np.empty(0, dtype=np.int64)  # Sorted timestamps kept from the parts before this one
+    for timestamps in part_timestamps:
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[1:] = timestamps[1:] > np.maximum.accumulate(timestamps)[:-1]
+        if len(merged):
+            after = np.searchsorted(merged, timestamps)
+            next_gap = merged[np.minimum(after, len(merged) - 1)] - timestamps
+            previous_gap = timestamps - merged[np.maximum(after - 1, 0)]
+            keep &= (np.abs(next_gap) >= DUPLICATE_SAMPLE_NS) & (np.abs(previous_gap) >= DUPLICATE_SAMPLE_NS)
+        rows = np.flatnonzero(keep)
+        kept_rows.append(rows)
+        kept_times.append(timestamps[rows])
+        if len(merged) and len(rows) and kept_times[-1][0] <= merged[-1]:
+            merged = np.sort(np.concatenate([merged, kept_times[-1]]))
+        else:
+            merged = np.concatenate([merged, kept_times[-1]])  # No overlap, so still sorted
+
+    order = np.argsort(np.concatenate(kept_times), kind='stable')
+    all_positions = np.empty(len(order), dtype=np.int64)
+    all_positions[order] = np.arange(len(order))
+    positions = np.split(all_positions, np.cumsum([len(rows) for rows in kept_rows])[:-1])
+    return kept_rows, positions, len(order)
+
+# Function to stitch the parts of one flight, in time order (see order_track_parts), into a single continuous track
+# Only the parts' timestamps are merged up front (read through the track cache); then one part at a time is
+# loaded, its kept samples are copied into the stitched track and it is released before loading the next
+def stitch_tracks(track_files, content_hashes=None):
+    if content_hashes is None:
+        content_hashes = [file_sha256(track_file) for track_file in track_files]
+    if len(track_files) == 1:
+        return load_track(track_files[0], content_hashes[0])
+
+    with profiling.stage('merge_parts') as stage:
+        part_timestamps = [load_track_timestamps(track_file, content_hash) for track_file, content_hash in zip(track_files, content_hashes)]
+        kept_rows, positions, num_points = merge_part_timestamps(part_timestamps)
+        stage.points = num_points
+    timestamps_ns = np.zeros(num_points, dtype=np.int64)
+    for k, timestamps in enumerate(part_timestamps):
+        timestamps_ns[positions[k]] = timestamps[kept_rows[k]]
+    del part_timestamps
+
+    columns = {name: np.full(num_points, np.nan) for name in ['latitude', 'longitude', 'altitude_m']}
+    channel_names = []
+    metadata = []
+    for k, (track_file, content_hash) in enumerate(zip(track_files, content_hashes)):
+        part = load_track(track_file, content_hash)
+        metadata.append(part.metadata)
+        for name, values in part.channels.items():
+            if name in DERIVED_CHANNELS:
+                continue
+            if name not in columns:
+                channel_names.append(name)
+                columns[name] = np.full(num_points, np.nan)
+            columns[name][positions[k]] = values[kept_rows[k]]
+        for name in ('latitude', 'longitude', 'altitude_m'):
+            columns[name][positions[k]] = getattr(part, name)[kept_rows[k]]
+        del part
+
+    # The flight runs from the first part's departure to the last part's arrival
+    stitched_metadata = dict(metadata[0])
+    titles = [(part_metadata.get('flightTitle') or '').split(' - ') for part_metadata in metadata]
+    if len(titles[0]) == 2 and len(titles[-1]) == 2:
+        stitched_metadata['flightTitle'] = f"{titles[0][0]} - {titles[-1][1]}"
+
+    channels = {name: columns[name] for name in channel_names}
+    track = Track(timestamps_ns, columns['latitude'], columns['longitude'], columns['altitude_m'], channels, stitched_metadata)
+    track.add_derived_channels()  # Speeds and courses across the joins
+    return track
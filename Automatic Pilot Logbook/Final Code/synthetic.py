@@ -0,0 +1,516 @@
+import argparse
+from collections import namedtuple
+import json
+import math
+import os
+import sys
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+from geodesy import EARTH_RADIUS_M, METERS_TO_FEET
+from kml_reader import CHANNEL_NAMES
+from track import Track, parse_timestamps, format_timestamps
+from airports import get_airport_database
+from solar import classify_light, NIGHT_LANDING
+from events import TAKEOFF, LANDING, LOW_PASS, detect_flight_events
+from maneuvers import find_steep_turns
+
+
+KNOTS_TO_MPS = 0.514444
+GRAVITY_MPS2 = 9.80665
+SYNTHETIC_START = '2024-06-01T14:00:00Z'  # Mid-morning in Alabama
+STEEP_TURN = 'steep turn'  # Scripted steep turns, alongside the event kinds in events.py
+
+# Flight profile of a light single (speeds in knots, heights in feet, rates in feet per minute)
+TAXI_SPEED_KTS = 10
+ROTATION_SPEED_KTS = 60
+PATTERN_SPEED_KTS = 80
+APPROACH_SPEED_KTS = 65
+CRUISE_SPEED_KTS = 110
+STEEP_TURN_SPEED_KTS = 90  # A 45 degree bank turns 360 degrees in 30 seconds at this speed
+STEEP_TURN_BANK_DEG = 45
+ACCELERATION_KTS_S = 3
+STANDARD_RATE_DEG_S = 3
+CLIMB_FPM = 700
+DESCENT_FPM = 500
+PATTERN_AGL_FT = 1000
+STEEP_TURN_AGL_FT = 2500
+LOW_PASS_AGL_FT = 200
+CRUISE_ALTITUDE_FT = 4500
+FINAL_M = 4000  # Straight-in final approach length
+DEPARTURE_COURSE = 90  # Runway course at an airport the script has not approached yet
+GPS_NOISE_TIME_CONSTANT_S = 30  # GPS errors wander slowly rather than jumping from sample to sample
+DROPOUT_SECONDS = (5, 60)  # Shortest and longest GPS dropout
+DROPOUT_EVENT_MARGIN_S = 90  # Dropouts never hide the samples around a scripted event
+
+# One step of a flight script; kind is one of STEP_KINDS, airport an identifier in the airport database
+# count repeats the step, minutes is the length of a hold or wait, direction the way a steep turn goes
+FlightStep = namedtuple('FlightStep', ['kind', 'airport', 'count', 'minutes', 'direction'], defaults=[None, 1, 0, 'left'])
+STEP_KINDS = ['takeoff', 'fly_to', 'touch_and_go', 'full_stop', 'low_pass', 'steep_turn', 'hold', 'wait']
+
+# One scripted event; index is the first sample at or after it in the generated track, light its light class
+# (solar.DAY, NIGHT or NIGHT_LANDING); full_stop is only set for landings, min_agl_ft for low passes and
+# direction for steep turns
+ExpectedEvent = namedtuple('ExpectedEvent', ['kind', 'index', 'timestamp_ns', 'airport_id', 'light', 'full_stop',
+                                             'min_agl_ft', 'direction'])
+
+
+# Function to move a value towards a target at a fixed rate per second, for every time offset
+def _ramp(start, end, time_s, rate):
+    return start + np.sign(end - start) * np.minimum(abs(end - start), rate * time_s)
+
+# Function to generate correlated GPS error: a first-order Gauss-Markov process with standard deviation sigma
+# x[k] = a * x[k-1] + sqrt(1 - a^2) * sigma * w[k] is evaluated in blocks with cumulative sums, scaling by a^-j
+# within a block (blocks are short enough that a^-j cannot overflow)
+def gauss_markov_noise(rng, num_points, sigma, time_constant_samples):
+    a = math.exp(-1 / time_constant_samples)
+    noise = np.empty(num_points)
+    previous = rng.normal(0, sigma)
+    block = max(1, int(20 * time_constant_samples))
+    for start in range(0, num_points, block):
+        k = np.arange(1, min(block, num_points - start) + 1)
+        weighted = math.sqrt(1 - a * a) * sigma * rng.normal(0, 1, len(k)) * a ** -k
+        noise[start:start + len(k)] = a ** k * (previous + np.cumsum(weighted))
+        previous = noise[start + len(k) - 1]
+    return noise
+
+# Function to get the shortest signed heading change from one course to another
+def _heading_change(from_course, to_course):
+    return (to_course - from_course + 180) % 360 - 180
+
+
+# Builds a flight sample by sample from scripted maneuvers, in local east/north meters from the first airport
+class _FlightBuilder:
+    def __init__(self, airport_db, rate_hz):
+        self.airport_db = airport_db
+        self.rate_hz = rate_hz
+        self.origin = None
+        self.parts = []  # Per-segment arrays: (east, north, altitude_ft, speed_kts, course, turn_rate)
+        self.events = []  # (kind, time_s, airport_id, full_stop, min_agl_ft, direction)
+        self.time_s = 0.0
+        self.east = self.north = 0.0
+        self.altitude_ft = 0.0
+        self.speed_kts = 0.0
+        self.course = float(DEPARTURE_COURSE)
+        self.airport = None  # The airport the aircraft is on the ground at, None when airborne
+        self.field_elevation_ft = 0.0  # Elevation of the last airport, for heights above ground
+        self.runway_course = {}  # Final approach course used at each airport
+
+    # Function to look up an airport's local position and elevation
+    def _airport(self, ident):
+        position = self.airport_db.find(ident)
+        if position < 0:
+            raise ValueError(f"Unknown airport {ident}")
+        record = self.airport_db.records[position]
+        latitude, longitude = float(record['latitude']), float(record['longitude'])
+        if self.origin is None:
+            self.origin = (latitude, longitude)
+        north = EARTH_RADIUS_M * math.radians(latitude - self.origin[0])
+        east = EARTH_RADIUS_M * math.radians(longitude - self.origin[1]) * math.cos(math.radians(latitude))
+        return east, north, float(record['elevation'])
+
+    # Function to append a segment of samples, given their speed, course and altitude, integrating the position
+    # scale_to_m stretches the distance flown to exactly that length, so legs end on their target
+    def _append(self, speed_kts, course, altitude_ft, turn_rate=0.0, scale_to_m=None):
+        step_m = speed_kts * KNOTS_TO_MPS / self.rate_hz
+        if scale_to_m is not None and step_m.sum() > 0:
+            step_m = step_m * (scale_to_m / step_m.sum())
+        radians = np.radians(course)
+        east = self.east + np.cumsum(step_m * np.sin(radians))
+        north = self.north + np.cumsum(step_m * np.cos(radians))
+        self.parts.append((east, north, altitude_ft, speed_kts, course % 360, np.full(len(course), float(turn_rate))))
+        self.time_s += len(course) / self.rate_hz
+        self.east, self.north = float(east[-1]), float(north[-1])
+        self.altitude_ft, self.speed_kts, self.course = float(altitude_ft[-1]), float(speed_kts[-1]), float(course[-1] % 360)
+
+    # Function to get the sample time offsets of a segment lasting duration_s
+    def _times(self, duration_s):
+        return np.arange(1, max(1, int(math.ceil(duration_s * self.rate_hz))) + 1) / self.rate_hz
+
+    # Function to roll along the ground (or stand still) at the field elevation while changing speed
+    def _ground(self, duration_s, speed_kts):
+        time_s = self._times(duration_s)
+        self._append(_ramp(self.speed_kts, speed_kts, time_s, ACCELERATION_KTS_S), np.full(len(time_s), self.course),
+                     np.full(len(time_s), self.field_elevation_ft))
+
+    # Function to turn onto a course at a turn rate (the shorter way unless a direction is given)
+    def _turn_to(self, course, rate=STANDARD_RATE_DEG_S, direction=None, speed_kts=None):
+        change = _heading_change(self.course, course)
+        if direction == 'left' and change > 0:
+            change -= 360
+        elif direction == 'right' and change < 0:
+            change += 360
+        if abs(change) < 1e-6:
+            return
+        time_s = self._times(abs(change) / rate)
+        speed = _ramp(self.speed_kts, speed_kts or self.speed_kts, time_s, ACCELERATION_KTS_S)
+        course = self.course + np.sign(change) * np.minimum(abs(change), rate * time_s)
+        self._append(speed, course, np.full(len(time_s), self.altitude_ft), np.sign(change) * rate)
+
+    # Function to fly straight to a local point, ending at end_altitude_ft
+    # The climb (or descent) runs at the normal rates up to top_altitude_ft and down again, or at a constant
+    # rate when the leg is too short for that
+    def _straight_to(self, east, north, speed_kts, end_altitude_ft, top_altitude_ft=None):
+        distance_m = math.hypot(east - self.east, north - self.north)
+        if distance_m < 1:
+            return
+        course = math.degrees(math.atan2(east - self.east, north - self.north)) % 360
+        time_s = self._times(distance_m / (speed_kts * KNOTS_TO_MPS))
+        duration_s = time_s[-1]
+        top = max(top_altitude_ft or 0, self.altitude_ft, end_altitude_ft)
+        altitude = np.minimum.reduce([self.altitude_ft + time_s / 60 * CLIMB_FPM, np.full(len(time_s), top),
+                                      end_altitude_ft + (duration_s - time_s) / 60 * DESCENT_FPM])
+        if altitude[0] < self.altitude_ft - CLIMB_FPM / 60 / self.rate_hz:
+            altitude = self.altitude_ft + (end_altitude_ft - self.altitude_ft) * time_s / duration_s
+        speed = _ramp(self.speed_kts, speed_kts, time_s, ACCELERATION_KTS_S)
+        self._append(speed, np.full(len(time_s), course), altitude, scale_to_m=distance_m)
+
+    # Function to climb straight ahead to an altitude
+    def _climb_to(self, altitude_ft, speed_kts):
+        time_s = self._times(max(0.0, altitude_ft - self.altitude_ft) / CLIMB_FPM * 60)
+        altitude = np.minimum(altitude_ft, self.altitude_ft + time_s / 60 * CLIMB_FPM)
+        self._append(_ramp(self.speed_kts, speed_kts, time_s, ACCELERATION_KTS_S), np.full(len(time_s), self.course), altitude)
+
+    # Function to record a scripted event at the current time
+    def _event(self, kind, airport_id, full_stop=None, min_agl_ft=None, direction=None):
+        self.events.append((kind, self.time_s, airport_id, full_stop, min_agl_ft, direction))
+
+    # Function to start the flight on the ground at an airport
+    def _start(self, airport):
+        self.east, self.north, self.field_elevation_ft = self._airport(airport)
+        self.altitude_ft = self.field_elevation_ft
+        self.airport = airport
+        self.parts.append(tuple(np.array([value]) for value in (self.east, self.north, self.altitude_ft, 0.0, self.course, 0.0)))
+
+    def takeoff(self, airport=None):
+        if self.origin is None:
+            if airport is None:
+                raise ValueError('The first takeoff needs an airport')
+            self._start(airport)
+        elif self.airport is None:
+            raise ValueError('Cannot take off while airborne')
+        airport = self.airport
+        self._ground(30, 0)
+        self._ground(60, TAXI_SPEED_KTS)
+        self.course = float(self.runway_course.get(airport, DEPARTURE_COURSE))  # Lined up on the runway
+        self._ground((ROTATION_SPEED_KTS - self.speed_kts) / ACCELERATION_KTS_S, ROTATION_SPEED_KTS)
+        self._event(TAKEOFF, airport)
+        self.airport = None
+        self._climb_to(self.field_elevation_ft + PATTERN_AGL_FT, PATTERN_SPEED_KTS)
+
+    def fly_to(self, airport):
+        if self.airport is not None:
+            raise ValueError(f"Take off before flying to {airport}")
+        east, north, elevation_ft = self._airport(airport)
+        course = math.degrees(math.atan2(east - self.east, north - self.north)) % 360
+        self._turn_to(course, speed_kts=CRUISE_SPEED_KTS)
+        course = math.degrees(math.atan2(east - self.east, north - self.north)) % 360
+        self.runway_course.setdefault(airport, course)
+        radians = math.radians(self.runway_course[airport])
+        self._straight_to(east - 2 * FINAL_M * math.sin(radians), north - 2 * FINAL_M * math.cos(radians),
+                          CRUISE_SPEED_KTS, elevation_ft + PATTERN_AGL_FT, CRUISE_ALTITUDE_FT)
+
+    # Function to fly a circuit onto a straight-in final and down to the runway (or to height_agl_ft over it)
+    def _final_approach(self, airport, height_agl_ft=0):
+        if self.airport is not None:
+            raise ValueError(f"Take off before approaching {airport}")
+        east, north, elevation_ft = self._airport(airport)
+        self.field_elevation_ft = elevation_ft
+        course = self.runway_course.setdefault(airport, math.degrees(math.atan2(east - self.east, north - self.north)) % 360)
+        radians = math.radians(course)
+        fix_east, fix_north = east - FINAL_M * math.sin(radians), north - FINAL_M * math.cos(radians)
+        if math.hypot(fix_east - self.east, fix_north - self.north) > 500:
+            self._turn_to(math.degrees(math.atan2(fix_east - self.east, fix_north - self.north)) % 360, speed_kts=PATTERN_SPEED_KTS)
+            self._straight_to(fix_east, fix_north, PATTERN_SPEED_KTS, elevation_ft + PATTERN_AGL_FT)
+        self._turn_to(course, direction='left')
+        self._straight_to(east, north, APPROACH_SPEED_KTS, elevation_ft + height_agl_ft)
+
+    def touch_and_go(self, airport):
+        self._final_approach(airport)
+        self._event(LANDING, airport, full_stop=False)
+        self._ground(7, 45)
+        self._ground((ROTATION_SPEED_KTS - self.speed_kts) / ACCELERATION_KTS_S, ROTATION_SPEED_KTS)
+        self._event(TAKEOFF, airport)
+        self._climb_to(self.field_elevation_ft + PATTERN_AGL_FT, PATTERN_SPEED_KTS)
+
+    def full_stop(self, airport):
+        self._final_approach(airport)
+        self._event(LANDING, airport, full_stop=True)
+        self.airport = airport
+        self._ground(self.speed_kts / ACCELERATION_KTS_S, 5)
+        self._ground(30, TAXI_SPEED_KTS)
+        self._ground(10, 0)
+
+    def low_pass(self, airport):
+        self._final_approach(airport, LOW_PASS_AGL_FT)
+        self._event(LOW_PASS, airport, min_agl_ft=LOW_PASS_AGL_FT)
+        time_s = self._times(10)
+        self._append(np.full(len(time_s), self.speed_kts), np.full(len(time_s), self.course), np.full(len(time_s), self.altitude_ft))
+        self._climb_to(self.field_elevation_ft + PATTERN_AGL_FT, PATTERN_SPEED_KTS)
+
+    def steep_turn(self, direction='left'):
+        if self.airport is not None:
+            raise ValueError('Take off before a steep turn')
+        self._climb_to(max(self.altitude_ft, self.field_elevation_ft + STEEP_TURN_AGL_FT), STEEP_TURN_SPEED_KTS)
+        time_s = self._times(20)  # Settle at the entry speed
+        self._append(_ramp(self.speed_kts, STEEP_TURN_SPEED_KTS, time_s, ACCELERATION_KTS_S), np.full(len(time_s), self.course),
+                     np.full(len(time_s), self.altitude_ft))
+        self._event(STEEP_TURN, None, direction=direction)
+        rate = math.degrees(GRAVITY_MPS2 * math.tan(math.radians(STEEP_TURN_BANK_DEG)) / (STEEP_TURN_SPEED_KTS * KNOTS_TO_MPS))
+        self._full_turn(rate, direction)
+        time_s = self._times(20)
+        self._append(np.full(len(time_s), self.speed_kts), np.full(len(time_s), self.course), np.full(len(time_s), self.altitude_ft))
+
+    # Function to turn through a full 360 degrees at a turn rate
+    def _full_turn(self, rate, direction):
+        sign = 1 if direction == 'right' else -1
+        time_s = self._times(360 / rate)
+        course = self.course + sign * np.minimum(360, rate * time_s)
+        self._append(np.full(len(time_s), self.speed_kts), course, np.full(len(time_s), self.altitude_ft), sign * rate)
+
+    # Function to fly a racetrack (1 minute legs, standard-rate turns) at the current position for some minutes
+    def hold(self, minutes):
+        if self.airport is not None:
+            raise ValueError('Take off before holding')
+        end_s = self.time_s + minutes * 60
+        while self.time_s < end_s:
+            leg_s = min(60, end_s - self.time_s)
+            time_s = self._times(leg_s)
+            self._append(_ramp(self.speed_kts, CRUISE_SPEED_KTS, time_s, ACCELERATION_KTS_S), np.full(len(time_s), self.course),
+                         np.full(len(time_s), self.altitude_ft))
+            if self.time_s < end_s:
+                self._turn_to(self.course + 180, direction='left')
+
+    # Function to stand still on the ground (e.g. to wait for dark)
+    def wait(self, minutes):
+        if self.airport is None:
+            raise ValueError('Land before waiting on the ground')
+        self._ground(minutes * 60, 0)
+
+    # Function to stack the segments into per-sample columns
+    def columns(self):
+        stacked = [np.concatenate(column) for column in zip(*self.parts)]
+        return dict(zip(['east', 'north', 'altitude_ft', 'speed_kts', 'course', 'turn_rate'], stacked))
+
+
+# Function to generate a flight from a script of FlightSteps
+# GPS noise (standard deviation in meters, 1.5x that vertically, correlated over about 30 s) is added to the
+# positions only, the recorder's speed and course channels stay smooth like ForeFlight's filtered values;
+# dropouts remove 5-60 s of samples,
+# but never within 90 s of a scripted event
+# Returns (track, expected_events)
+def generate_flight(steps, rate_hz=1, start=SYNTHETIC_START, noise_m=0.0, dropouts_per_hour=0.0, seed=0,
+                    airports_csv=None, tail_number='N0SYN'):
+    builder = _FlightBuilder(get_airport_database(airports_csv), rate_hz)
+    visited = []
+    for step in steps:
+        step = FlightStep(*step) if not isinstance(step, FlightStep) else step
+        if step.kind not in STEP_KINDS:
+            raise ValueError(f"Unknown flight step {step.kind}")
+        for _ in range(step.count):
+            if step.kind in ('takeoff', 'fly_to', 'touch_and_go', 'full_stop', 'low_pass'):
+                if step.kind != 'takeoff' or builder.origin is None:
+                    visited.append(step.airport)
+                getattr(builder, step.kind)(step.airport)
+            elif step.kind == 'steep_turn':
+                builder.steep_turn(step.direction)
+            else:
+                getattr(builder, step.kind)(step.minutes)
+    columns = builder.columns()
+    num_points = len(columns['east'])
+    time_s = np.arange(num_points) / rate_hz
+    rng = np.random.default_rng(seed)
+
+    # GPS dropouts, kept clear of the scripted events
+    keep = np.ones(num_points, dtype=bool)
+    event_times = np.array([event[1] for event in builder.events])
+    for _ in range(rng.poisson(dropouts_per_hour * time_s[-1] / 3600)):
+        gap_start = rng.uniform(0, time_s[-1])
+        gap_end = gap_start + rng.uniform(*DROPOUT_SECONDS)
+        if np.any((event_times > gap_start - DROPOUT_EVENT_MARGIN_S) & (event_times < gap_end + DROPOUT_EVENT_MARGIN_S)):
+            continue
+        keep &= (time_s < gap_start) | (time_s >= gap_end)
+
+    east, north, altitude_m = columns['east'], columns['north'], columns['altitude_ft'] / METERS_TO_FEET
+    if noise_m:
+        time_constant = GPS_NOISE_TIME_CONSTANT_S * rate_hz
+        east = east + gauss_markov_noise(rng, num_points, noise_m, time_constant)
+        north = north + gauss_markov_noise(rng, num_points, noise_m, time_constant)
+        altitude_m = altitude_m + gauss_markov_noise(rng, num_points, 1.5 * noise_m, time_constant)
+    origin_lat, origin_lon = builder.origin
+    latitude = origin_lat + np.degrees(north / EARTH_RADIUS_M)
+    longitude = origin_lon + np.degrees(east / (EARTH_RADIUS_M * np.cos(np.radians(latitude))))
+
+    # Recorder channels: coordinated bank for the turn rate and pitch for the climb angle
+    speed_kts = columns['speed_kts']
+    speed_mps = np.maximum(speed_kts * KNOTS_TO_MPS, 1)
+    bank = np.degrees(np.arctan(speed_mps * np.radians(columns['turn_rate']) / GRAVITY_MPS2))
+    vertical_fpm = np.gradient(columns['altitude_ft'], time_s) * 60 if num_points > 1 else np.zeros(num_points)
+    pitch = np.degrees(np.arctan2(vertical_fpm / METERS_TO_FEET / 60, speed_mps))
+    timestamps_ns = parse_timestamps([start])[0] + np.round(time_s * 1e9).astype(np.int64)
+    channels = {
+        'acc_horiz': np.zeros(num_points),
+        'acc_vert': np.zeros(num_points),
+        'course': columns['course'],
+        'speed_kts': speed_kts,
+        'altitude': columns['altitude_ft'],
+        'bank': bank,
+        'pitch': pitch,
+    }
+    channels = {name: values[keep] for name, values in channels.items()}
+    metadata = {
+        'source': 'Synthetic',
+        'GPSModelName': 'Synthetic',
+        'flightTitle': f"{visited[0]} - {visited[-1]}",
+        'pilotName': None,
+        'tailNumber': tail_number,
+        'pilotNotes': None,
+        'routeWaypoints': ' '.join(dict.fromkeys(visited)),
+    }
+    track = Track(timestamps_ns[keep], latitude[keep], longitude[keep], altitude_m[keep],
+                  channels, metadata)
+    track.add_derived_channels()
+
+    # Ground truth, with each event's light class at the sample the pipeline will see
+    light = classify_light(track.timestamps_ns, track.latitude, track.longitude)
+    expected = []
+    for kind, event_s, airport_id, full_stop, min_agl_ft, direction in builder.events:
+        timestamp_ns = int(timestamps_ns[0] + round(event_s * 1e9))
+        index = min(int(np.searchsorted(track.timestamps_ns, timestamp_ns)), len(track) - 1)
+        expected.append(ExpectedEvent(kind, index, timestamp_ns, airport_id, int(light[index]), full_stop, min_agl_ft, direction))
+    return track, expected
+
+# Function to total the expected events the way the logbook counts them
+# Returns {'takeoffs', 'steep_turns', 'landings': {airport: {'day_full_stop', ...}}, 'low_passes': {airport: count}}
+def expected_totals(expected):
+    totals = {'takeoffs': 0, 'steep_turns': 0, 'landings': {}, 'low_passes': {}}
+    for event in expected:
+        if event.kind == TAKEOFF:
+            totals['takeoffs'] += 1
+        elif event.kind == STEEP_TURN:
+            totals['steep_turns'] += 1
+        elif event.kind == LOW_PASS:
+            totals['low_passes'][event.airport_id] = totals['low_passes'].get(event.airport_id, 0) + 1
+        elif event.kind == LANDING:
+            key = f"{'night' if event.light == NIGHT_LANDING else 'day'}_{'full_stop' if event.full_stop else 'touch_and_go'}"
+            counts = totals['landings'].setdefault(event.airport_id, {})
+            counts[key] = counts.get(key, 0) + 1
+    return totals
+
+# Function to total what the detectors find in a track, in the same form as expected_totals, so a generated
+# flight (or one read back from its KML) can be checked against its sidecar
+def detected_totals(track, airports_csv=None):
+    events, _ = detect_flight_events(track, get_airport_database(airports_csv))
+    totals = expected_totals(events)
+    totals['steep_turns'] = len(find_steep_turns(track))
+    return totals
+
+# Function to get the expected-events sidecar file written next to a synthetic KML file
+def expected_events_path(kml_file):
+    return f"{os.path.splitext(kml_file)[0]}.events.json"
+
+# Function to write the expected events (and their totals) as a JSON sidecar
+def write_expected_events(expected, events_file, **details):
+    with open(events_file, 'w') as file:
+        json.dump(dict(details, events=[event._asdict() for event in expected], totals=expected_totals(expected)), file, indent=2)
+
+# Function to read an expected-events sidecar back into ExpectedEvents
+def read_expected_events(events_file):
+    with open(events_file) as file:
+        return [ExpectedEvent(**event) for event in json.load(file)['events']]
+
+# Function to get a named test scenario as (start time, steps)
+# endurance is a takeoff, a hold and a full stop lasting about `hours`, for load and stress tests
+def scenario(name, hours=1.0):
+    scenarios = {
+        'pattern_work': (SYNTHETIC_START, [
+            FlightStep('takeoff', 'KEKY'), FlightStep('touch_and_go', 'KEKY', count=3),
+            FlightStep('low_pass', 'KEKY'), FlightStep('full_stop', 'KEKY'),
+        ]),
+        'steep_turns': (SYNTHETIC_START, [
+            FlightStep('takeoff', 'KEKY'), FlightStep('steep_turn', direction='left'), FlightStep('steep_turn', direction='right'),
+            FlightStep('full_stop', 'KEKY'),
+        ]),
+        'cross_country': (SYNTHETIC_START, [
+            FlightStep('takeoff', 'KEKY'), FlightStep('fly_to', 'KANB'), FlightStep('touch_and_go', 'KANB'),
+            FlightStep('fly_to', 'KASN'), FlightStep('low_pass', 'KASN'), FlightStep('full_stop', 'KASN'),
+            FlightStep('takeoff'), FlightStep('fly_to', 'KEKY'), FlightStep('full_stop', 'KEKY'),
+        ]),
+        # Day landings before sunset (about 00:55Z), then night landings more than an hour after it
+        'night': ('2024-06-02T00:00:00Z', [
+            FlightStep('takeoff', 'KEKY'), FlightStep('touch_and_go', 'KEKY'), FlightStep('full_stop', 'KEKY'),
+            FlightStep('wait', minutes=120), FlightStep('takeoff'), FlightStep('touch_and_go', 'KEKY', count=2),
+            FlightStep('full_stop', 'KEKY'),
+        ]),
+        'endurance': (SYNTHETIC_START, [
+            FlightStep('takeoff', 'KEKY'), FlightStep('hold', minutes=max(0.0, hours * 60 - 10)), FlightStep('full_stop', 'KEKY'),
+        ]),
+    }
+    return scenarios[name]
+
+SCENARIOS = ['pattern_work', 'steep_turns', 'cross_country', 'night', 'endurance']
+
+# Function to build an endurance flight of the given length and sample rate as an in-memory Track
+def synthetic_track(hours, rate_hz, noise_m=0.0, dropouts_per_hour=0.0, seed=0):
+    start, steps = scenario('endurance', hours)
+    return generate_flight(steps, rate_hz, start, noise_m, dropouts_per_hour, seed)[0]
+
+# Function to write a track as a ForeFlight-style KML track log (gx:Track points, then the
+# SimpleArrayData channels and the flight's Data fields), formatting chunk_size points at a time
+def write_kml(track, output_kml_file, chunk_size=100000):
+    with open(output_kml_file, 'w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">\n'
+                   '<Document>\n<Placemark>\n<gx:Track>\n<altitudeMode>absolute</altitudeMode>\n')
+        for start in range(0, len(track), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            whens = format_timestamps(track.timestamps_ns[chunk]).tolist()
+            file.write(''.join(f"<when>{when}</when>\n<gx:coord>{lon:.7f} {lat:.7f} {alt:.1f}</gx:coord>\n" for when, lon, lat, alt in
+                               zip(whens, track.longitude[chunk].tolist(), track.latitude[chunk].tolist(), track.altitude_m[chunk].tolist())))
+        file.write('</gx:Track>\n</Placemark>\n<ExtendedData>\n<SchemaData>\n')
+        for name in CHANNEL_NAMES:
+            values = track.channels.get(name, np.full(len(track), np.nan))
+            file.write(f'<gx:SimpleArrayData name="{name}">\n')
+            for start in range(0, len(track), chunk_size):
+                file.write(''.join(f"<gx:value>{value:.2f}</gx:value>\n" for value in values[start:start + chunk_size].tolist()))
+            file.write('</gx:SimpleArrayData>\n')
+        file.write('</SchemaData>\n')
+        for name, value in track.metadata.items():
+            file.write(f'<Data name={quoteattr(name)}>\n<value>{escape(str(value or ""))}</value>\n</Data>\n')
+        file.write('</ExtendedData>\n</Document>\n</kml>\n')
+
+
+# Command line: python synthetic.py night.kml --scenario night --rate-hz 10 --noise-m 3 --dropouts-per-hour 2
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic ForeFlight KML track log and its expected-events sidecar.')
+    parser.add_argument('output_kml', help='KML file to write; the expected events go to <name>.events.json')
+    parser.add_argument('--scenario', choices=SCENARIOS, default='pattern_work')
+    parser.add_argument('--hours', type=float, default=1.0, help='Length of the endurance scenario')
+    parser.add_argument('--rate-hz', type=float, default=1.0, help='Samples per second')
+    parser.add_argument('--noise-m', type=float, default=0.0, help='GPS position noise (standard deviation in meters)')
+    parser.add_argument('--dropouts-per-hour', type=float, default=0.0, help='Average number of GPS dropouts per hour')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--airports-csv', default=None, help='Airport database CSV (default: built-in Alabama list)')
+    parser.add_argument('--check', action='store_true', help='Read the KML back and compare the detected events with the sidecar')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    start, steps = scenario(args.scenario, args.hours)
+    track, expected = generate_flight(steps, args.rate_hz, start, args.noise_m, args.dropouts_per_hour, args.seed, args.airports_csv)
+    write_kml(track, args.output_kml)
+    write_expected_events(expected, expected_events_path(args.output_kml), scenario=args.scenario, start=start,
+                          rate_hz=args.rate_hz, noise_m=args.noise_m, dropouts_per_hour=args.dropouts_per_hour,
+                          seed=args.seed, points=len(track), steps=[step._asdict() for step in steps])
+    print(f"Wrote {len(track)} points and {len(expected)} expected events to {args.output_kml}")
+    if args.check:
+        expected = expected_totals(read_expected_events(expected_events_path(args.output_kml)))
+        detected = detected_totals(Track.from_kml(args.output_kml), args.airports_csv)
+        if detected != expected:
+            print(f"Detected events differ from the sidecar:\n  expected {expected}\n  detected {detected}")
+            return 1
+        print("Detected events match the sidecar")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import numpy as np
+from airports import get_airport_database
+from events import detect_flight_events, TAKEOFF, LANDING, LOW_PASS
+from geodesy import METERS_TO_FEET
+from track import Track, parse_timestamps
+
+
+START_NS = int(parse_timestamps(['2024-06-01T15:00:00Z'])[0])  # Mid-morning in Alabama
+
+
+# Function to build a 1 Hz track over KEKY from (seconds, height above the field, speed) segments; the height
+# and speed change linearly over each segment
+def airport_track(segments, noise_ft=0.0, seed=0):
+    airport_db = get_airport_database()
+    airport = airport_db.records[list(airport_db.records['ident']).index('KEKY')]
+    agl_ft = np.concatenate([np.linspace(start, end, seconds, endpoint=False) for seconds, (start, end), _ in segments])
+    speed_kts = np.concatenate([np.linspace(start, end, seconds, endpoint=False) for seconds, _, (start, end) in segments])
+    agl_ft = agl_ft + np.random.default_rng(seed).normal(0, noise_ft, len(agl_ft))
+    num_points = len(agl_ft)
+    channels = {'speed_kts': speed_kts, 'course': np.full(num_points, 90.0)}
+    return Track(START_NS + np.arange(num_points) * 10**9, np.full(num_points, airport['latitude']),
+                 np.full(num_points, airport['longitude']), (airport['elevation'] + agl_ft) / METERS_TO_FEET, channels), airport_db
+
+DESCENT = (120, (1000, 0), (80, 65))  # Straight in from pattern altitude to the runway
+
+
+# A touch and go that never slows below 50 kt on the runway is still a landing
+def test_fast_touch_and_go():
+    track, airport_db = airport_track([(60, (1000, 1000), (80, 80)), DESCENT, (10, (0, 0), (60, 55)),
+                                       (90, (0, 1000), (65, 75))])
+    events, _ = detect_flight_events(track, airport_db)
+    assert [(event.kind, event.full_stop) for event in events] == [(LANDING, False), (TAKEOFF, None)]
+
+# Slowing to a stop after touchdown makes the landing a full stop
+def test_full_stop():
+    track, airport_db = airport_track([(60, (1000, 1000), (80, 80)), DESCENT, (20, (0, 0), (65, 5)), (60, (0, 0), (5, 0))])
+    events, _ = detect_flight_events(track, airport_db)
+    assert [(event.kind, event.full_stop, event.airport_id) for event in events] == [(LANDING, True, 'KEKY')]
+
+# GPS noise while levelling off around pattern height after takeoff never makes a low pass
+def test_noisy_climb_out_has_no_low_pass():
+    for seed in range(10):
+        track, airport_db = airport_track([(30, (0, 0), (0, 60)), (60, (0, 300), (60, 75)), (60, (300, 300), (75, 75)),
+                                           (60, (300, 1000), (75, 80))], noise_ft=15, seed=seed)
+        events, _ = detect_flight_events(track, airport_db)
+        assert [event.kind for event in events] == [TAKEOFF]
+
+# An approach that goes well below pattern height and climbs away without touching down is a low pass
+def test_low_pass():
+    track, airport_db = airport_track([(60, (1000, 1000), (80, 80)), (90, (1000, 150), (80, 65)),
+                                       (10, (150, 150), (65, 65)), (90, (150, 1000), (65, 80))])
+    events, _ = detect_flight_events(track, airport_db)
+    assert [event.kind for event in events] == [LOW_PASS]
+    assert 140 < events[0].min_agl_ft < 160
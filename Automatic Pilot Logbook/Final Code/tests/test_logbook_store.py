@@ -0,0 +1,66 @@
+import sqlite3
+from datetime import date
+from logbook_store import LogbookStore, LOGBOOK_COLUMNS
+
+
+# Function to build a logbook row (LOGBOOK_COLUMNS order) with the given landings, approaches and remarks
+def logbook_row(flight_date, day_landings=0, night_landings=0, approaches=0, total=1.0, remarks=''):
+    row = [0] * len(LOGBOOK_COLUMNS)
+    row[LOGBOOK_COLUMNS.index('Date')] = flight_date.strftime('%m/%d/%Y')
+    row[LOGBOOK_COLUMNS.index('Tail #')] = 'N5700W'
+    row[LOGBOOK_COLUMNS.index('Day Land')] = day_landings
+    row[LOGBOOK_COLUMNS.index('Night Land')] = night_landings
+    row[LOGBOOK_COLUMNS.index('# Inst App')] = approaches
+    row[LOGBOOK_COLUMNS.index('Total')] = total
+    row[LOGBOOK_COLUMNS.index('Remarks')] = remarks
+    return row
+
+# Function to read both rollup tables, to compare the trigger-maintained totals with a full recompute
+def rollups(path):
+    connection = sqlite3.connect(path)
+    try:
+        return (connection.execute('SELECT * FROM daily_totals ORDER BY date').fetchall(),
+                connection.execute('SELECT * FROM lifetime_totals').fetchall())
+    finally:
+        connection.close()
+
+
+# The rollups kept by the triggers through inserts and edits match the ones rebuilt from the flights
+def test_rollups_match_full_recompute(tmp_path):
+    path = str(tmp_path / 'logbook.sqlite')
+    store = LogbookStore(path)
+    store.add_flights([{'content_hash': f'flight-{k}', 'start_ns': k,
+                        'row': logbook_row(date(2024, 10, 1 + k % 5), day_landings=k % 3, total=0.5 + k,
+                                           remarks=f'KEKY: {k % 2} night full stop landings')} for k in range(12)])
+    store.upsert_flights([{'content_hash': 'flight-3', 'row': logbook_row(date(2024, 10, 9), night_landings=2, total=2.5)},
+                          {'content_hash': 'flight-new', 'row': logbook_row(date(2024, 10, 1), approaches=4)}])
+    incremental = rollups(path)
+
+    store.rebuild_rollups()
+    assert rollups(path) == incremental
+    assert store.totals()['Flights'] == len(store) == 13
+    assert store.totals()['Total'] == sum(0.5 + k for k in range(12) if k != 3) + 2.5 + 1.0
+
+# Landings count from the day after the 90-day window starts, and night currency only counts full stops
+def test_currency_windows(tmp_path):
+    store = LogbookStore(str(tmp_path / 'logbook.sqlite'))
+    as_of = date(2024, 10, 10)
+    store.add_flights([
+        {'content_hash': 'too-old', 'row': logbook_row(date(2024, 7, 12), day_landings=5)},  # 90 days before as_of
+        {'content_hash': 'oldest', 'row': logbook_row(date(2024, 7, 13), day_landings=1)},
+        {'content_hash': 'night', 'row': logbook_row(date(2024, 10, 1), night_landings=3,
+                                                     remarks='KEKY: 2 night full stop landings; KEKY: 1 night touch and go landings')},
+        {'content_hash': 'later', 'row': logbook_row(date(2024, 10, 11), night_landings=1,
+                                                     remarks='KEKY: 1 night full stop landings')},
+        # Six calendar months before October plus October so far: approaches from April 1st count
+        {'content_hash': 'march', 'row': logbook_row(date(2024, 3, 31), approaches=6)},
+        {'content_hash': 'april', 'row': logbook_row(date(2024, 4, 1), approaches=5)},
+    ])
+
+    currency = store.currency(as_of)
+    assert (currency.day_landings, currency.night_landings, currency.night_full_stop_landings) == (1, 3, 2)
+    assert currency.passenger_current and not currency.night_current
+    assert currency.instrument_approaches == 5 and not currency.instrument_current
+
+    currency = store.currency(date(2024, 10, 11))
+    assert currency.night_full_stop_landings == 3 and currency.night_current
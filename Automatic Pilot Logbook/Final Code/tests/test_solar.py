@@ -0,0 +1,26 @@
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+import pytest
+from solar import sunrise_sunset_ns
+
+astral_sun = pytest.importorskip('astral.sun')
+from astral import Observer
+
+
+# (latitude, longitude) of airports in both hemispheres and at high latitude
+LOCATIONS = [(33.37, -86.95), (51.47, -0.45), (-33.95, 151.18), (61.17, -149.99)]
+DATES = [date(2024, 1, 15), date(2024, 6, 21), date(2024, 10, 10)]
+
+
+# The vectorised NOAA sun model agrees with astral to within a minute for sunrise and sunset of the local day
+@pytest.mark.parametrize('day', DATES, ids=str)
+@pytest.mark.parametrize('latitude, longitude', LOCATIONS)
+def test_sunrise_sunset_match_astral(latitude, longitude, day):
+    local_zone = timezone(timedelta(hours=round(longitude / 15)))
+    noon = datetime(day.year, day.month, day.day, 12, tzinfo=local_zone)
+    sunrise_ns, sunset_ns, polar = sunrise_sunset_ns(np.array([int(noon.timestamp() * 10**9)]), [latitude], [longitude])
+
+    observer = Observer(latitude, longitude)
+    assert polar[0] == 0
+    assert abs(sunrise_ns[0] / 1e9 - astral_sun.sunrise(observer, day, local_zone).timestamp()) < 60
+    assert abs(sunset_ns[0] / 1e9 - astral_sun.sunset(observer, day, local_zone).timestamp()) < 60
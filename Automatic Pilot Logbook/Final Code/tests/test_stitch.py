@@ -0,0 +1,47 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from stitch import group_track_parts, merge_part_timestamps, stitch_tracks
+
+
+KML_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'KML')
+PART_01 = 'TrackLog_D8FE15DD-0052-481D-8061-53C1633528B4-2024.10.10-part01.kml'
+PART_02 = 'TrackLog_CBF767C2-0BA0-4C8B-85A1-863B5C9AC9D1-2024.10.10-part02.kml'
+SINGLE = 'TrackLog_E54708BF-CEEB-412E-B04F-CDF3C14E8D6D-2024.10.15.kml'
+SECOND_NS = 10**9
+
+
+# Copies of the bundled samples, so the track cache is written next to them in the test's own directory
+@pytest.fixture
+def samples(tmp_path):
+    for name in (PART_01, PART_02, SINGLE):
+        shutil.copy(os.path.join(KML_DIR, name), tmp_path / name)
+    return tmp_path
+
+
+# ForeFlight gave the two parts of the 10.10 flight different recording ids; they are still one flight
+def test_group_track_parts_joins_the_split_recording(samples):
+    files = [str(samples / name) for name in (SINGLE, PART_02, PART_01)]
+    assert group_track_parts(files) == [[str(samples / PART_01), str(samples / PART_02)], [str(samples / SINGLE)]]
+
+# Samples of a later part within half a second of an earlier part's are dropped; the rest interleave in time
+def test_merge_part_timestamps_drops_overlap():
+    first = np.arange(11) * SECOND_NS
+    second = np.array([8.5, 9.8, 10.3, 11, 12]) * SECOND_NS
+    kept_rows, positions, num_points = merge_part_timestamps([first, second])
+    assert num_points == 14
+    assert kept_rows[0].tolist() == list(range(11)) and kept_rows[1].tolist() == [0, 3, 4]
+    assert positions[0].tolist() == [0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 11] and positions[1].tolist() == [9, 12, 13]
+
+# A sample at or before an earlier sample of the same part is dropped
+def test_merge_part_timestamps_drops_repeated_times():
+    kept_rows, positions, num_points = merge_part_timestamps([np.array([0, 1, 1, 3, 2, 4]) * SECOND_NS])
+    assert kept_rows[0].tolist() == [0, 1, 3, 5] and positions[0].tolist() == [0, 1, 2, 3] and num_points == 4
+
+# The stitched 10.10 flight runs from part01's departure to part02's arrival in strictly increasing time
+def test_stitch_sample_pair(samples):
+    track = stitch_tracks([str(samples / PART_01), str(samples / PART_02)])
+    assert len(track) == 7726
+    assert (np.diff(track.timestamps_ns) > 0).all()
+    assert not np.isnan(track.latitude).any()
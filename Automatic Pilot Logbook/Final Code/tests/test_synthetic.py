@@ -0,0 +1,35 @@
+import pytest
+from synthetic import (SCENARIOS, scenario, generate_flight, write_kml, write_expected_events, read_expected_events,
+                       expected_events_path, expected_totals, detected_totals)
+from track import Track
+
+
+# (rate_hz, noise_m, dropouts_per_hour): clean 1 Hz logs, and noisy 10 Hz logs with GPS dropouts
+CONDITIONS = [(1, 0.0, 0.0), (10, 3.0, 2.0)]
+
+
+# Every scenario, written as KML and read back, is detected exactly as its expected-events sidecar says
+@pytest.mark.parametrize('conditions', CONDITIONS, ids=['1hz', '10hz-noisy'])
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_scenario_round_trip(tmp_path, name, conditions):
+    rate_hz, noise_m, dropouts_per_hour = conditions
+    start, steps = scenario(name)
+    track, expected = generate_flight(steps, rate_hz, start, noise_m, dropouts_per_hour, seed=1)
+    kml_file = str(tmp_path / f'{name}.kml')
+    write_kml(track, kml_file)
+    write_expected_events(expected, expected_events_path(kml_file))
+
+    expected = expected_totals(read_expected_events(expected_events_path(kml_file)))
+    assert detected_totals(Track.from_kml(kml_file)) == expected
+
+# Metadata with XML special characters still gives a KML the reader can parse
+def test_metadata_is_escaped(tmp_path):
+    start, steps = scenario('pattern_work')
+    track, _ = generate_flight(steps, 1, start, tail_number='N1 <A&B>')
+    track.metadata['pilot "name"'] = 'Smith & Sons'
+    kml_file = str(tmp_path / 'escaped.kml')
+    write_kml(track, kml_file)
+
+    metadata = Track.from_kml(kml_file).metadata
+    assert metadata['tailNumber'] == 'N1 <A&B>'
+    assert metadata['pilot "name"'] == 'Smith & Sons'
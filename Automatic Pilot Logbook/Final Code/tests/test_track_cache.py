@@ -0,0 +1,40 @@
+import os
+import shutil
+import numpy as np
+from track_cache import load_track, evict_tracks
+
+
+SAMPLE_KML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'KML',
+                          'TrackLog_CBF767C2-0BA0-4C8B-85A1-863B5C9AC9D1-2024.10.10-part02.kml')
+
+
+# Eviction removes the least recently used tracks until the cache fits, and leaves other files alone
+def test_evict_keeps_cache_under_cap(tmp_path):
+    for k in range(5):
+        cache_file = tmp_path / f'track-{k}.v1.npz'
+        cache_file.write_bytes(b'x' * 100)
+        os.utime(cache_file, (1000 + k, 1000 + k))
+    (tmp_path / 'notes.txt').write_bytes(b'x' * 1000)
+
+    assert evict_tracks(str(tmp_path), max_bytes=250) == 3
+    assert sorted(os.listdir(tmp_path)) == ['notes.txt', 'track-3.v1.npz', 'track-4.v1.npz']
+    assert evict_tracks(str(tmp_path), max_bytes=250) == 0
+
+# A cached track loads back identical to the parsed one, and a cache capped below two tracks keeps the newest
+def test_load_track_round_trip_and_cap(tmp_path):
+    kml_files = [str(tmp_path / 'first.kml'), str(tmp_path / 'second.kml')]
+    shutil.copy(SAMPLE_KML, kml_files[0])
+    shutil.copy(SAMPLE_KML, kml_files[1])
+    with open(kml_files[1], 'ab') as file:
+        file.write(b'\n')  # Same track, different content hash
+    cache_dir = str(tmp_path / 'cache')
+
+    parsed = load_track(kml_files[0], cache_dir=cache_dir)
+    cached = load_track(kml_files[0], cache_dir=cache_dir)
+    assert np.array_equal(parsed.timestamps_ns, cached.timestamps_ns)
+    assert all(np.array_equal(parsed.channels[name], cached.channels[name], equal_nan=True) for name in parsed.channels)
+    assert cached.metadata == parsed.metadata
+
+    (first_cache,) = os.listdir(cache_dir)
+    load_track(kml_files[1], cache_dir=cache_dir, max_bytes=os.path.getsize(os.path.join(cache_dir, first_cache)) + 100)
+    assert len(os.listdir(cache_dir)) == 1 and os.listdir(cache_dir) != [first_cache]
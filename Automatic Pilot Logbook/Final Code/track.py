@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from kml_reader import read_kml_track
+from geodesy import ground_speed_course, vertical_speed_fpm, METERS_TO_FEET
+
+
+# Function to parse ISO-8601 UTC timestamps (e.g. 2024-10-11T02:19:58.18Z) into int64 epoch nanoseconds
+def parse_timestamps(timestamps):
+    timestamps = np.char.rstrip(np.asarray(timestamps, dtype=str), 'Z')
+    return timestamps.astype('datetime64[ns]').astype(np.int64)
+
+# Function to convert one int64 epoch-nanosecond timestamp into a naive UTC datetime
+def to_datetime(timestamp_ns):
+    return datetime(1970, 1, 1) + timedelta(microseconds=int(timestamp_ns) // 1000)
+
+# Function to format int64 epoch nanoseconds back into the ISO-8601 strings used in the CSV files
+def format_timestamps(timestamps_ns):
+    return np.char.add(np.datetime_as_string(np.asarray(timestamps_ns).astype('datetime64[ns]'), unit='ms'), 'Z')
+
+
+# Columnar flight track handed from stage to stage in memory
+class Track:
+    def __init__(self, timestamps_ns, latitude, longitude, altitude_m, channels=None, metadata=None):
+        self.timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.altitude_m = np.asarray(altitude_m, dtype=np.float64)
+        self.channels = channels if channels is not None else {}  # Per-sample recorder and derived channels
+        self.metadata = metadata if metadata is not None else {}  # ExtendedData (tailNumber, flightTitle, ...)
+
+    @classmethod
+    def from_kml(cls, input_kml_file):
+        columns, metadata = read_kml_track(input_kml_file)
+        channels = {name: values for name, values in columns.items() if name not in ('timestamp', 'latitude', 'longitude', 'altitude_m')}
+        track = cls(parse_timestamps(columns['timestamp']), columns['latitude'], columns['longitude'], columns['altitude_m'], channels, metadata)
+        track.add_derived_channels()
+        return track
+
+    # Function to load a track saved with save_npz (no pickled objects, the metadata is stored as JSON)
+    @classmethod
+    def load_npz(cls, npz_file):
+        with np.load(npz_file, allow_pickle=False) as data:
+            channels = {name[len('channel_'):]: data[name] for name in data.files if name.startswith('channel_')}
+            return cls(data['timestamps_ns'], data['latitude'], data['longitude'], data['altitude_m'], channels, json.loads(str(data['metadata'])))
+
+    def __len__(self):
+        return len(self.timestamps_ns)
+
+    # Function to save the decoded track (every recorder and derived channel plus the metadata) as a compressed .npz
+    def save_npz(self, npz_file):
+        channels = {f'channel_{name}': values for name, values in self.channels.items()}
+        np.savez_compressed(npz_file, timestamps_ns=self.timestamps_ns, latitude=self.latitude, longitude=self.longitude,
+                            altitude_m=self.altitude_m, metadata=np.array(json.dumps(self.metadata)), **channels)
+
+    # Function to add ground speed, ground course and vertical speed computed from the positions
+    def add_derived_channels(self):
+        ground_speed, ground_course = ground_speed_course(self.timestamps_ns, self.latitude, self.longitude)
+        self.channels['ground_speed_kts'] = ground_speed
+        self.channels['ground_course'] = ground_course
+        self.channels['vertical_speed_fpm'] = vertical_speed_fpm(self.timestamps_ns, self.altitude_ft)
+
+        # Logs without recorder speed/course fall back to the position-derived values
+        missing = np.full(len(self), np.nan)
+        if np.isnan(self.channels.get('speed_kts', missing)).all():
+            self.channels['speed_kts'] = ground_speed
+        if np.isnan(self.channels.get('course', missing)).all():
+            self.channels['course'] = ground_course
+
+    @property
+    def altitude_ft(self):
+        return self.altitude_m * METERS_TO_FEET  # Convert altitude to feet
+
+    @property
+    def speed_kts(self):
+        return self.channels['speed_kts']
+
+    @property
+    def course(self):
+        return self.channels['course']
+
+    # Function to build the per-point DataFrame used by the logbook stages
+    def to_dataframe(self):
+        nan_column = np.full(len(self), np.nan)
+        return pd.DataFrame({
+            'Timestamp': format_timestamps(self.timestamps_ns),
+            'Speed (knots)': self.channels.get('speed_kts', nan_column),
+            'Altitude (feet)': self.altitude_ft,
+            'Course (degrees)': self.channels.get('course', nan_column),
+            'Bank (degrees)': self.channels.get('bank', nan_column),
+            'Pitch (degrees)': self.channels.get('pitch', nan_column),
+            'Latitude': self.latitude,
+            'Longitude': self.longitude,
+        })
+
+    # Function to export the cleaned track as CSV (optional side output, nothing reads it back)
+    def to_csv(self, cleaned_csv_file):
+        df = self.to_dataframe()
+        df['TailNumber'] = self.metadata.get('tailNumber')
+        df['Source'] = self.metadata.get('source')
+        df['GPSModelName'] = self.metadata.get('GPSModelName')
+        df['FlightTitle'] = self.metadata.get('flightTitle')
+        df.to_csv(cleaned_csv_file, index=False, float_format='%.6f')
@@ -0,0 +1,87 @@
+import os
+import zipfile
+import numpy as np
+from kml_reader import PARSER_VERSION
+from hashing import file_sha256
+from track import Track
+import profiling
+
+
+TRACK_CACHE_DIR = '.track_cache'  # Created next to the KML files
+TRACK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+# Function to get the cache file for a track log's content hash and the current parser version
+def track_cache_path(cache_dir, content_hash):
+    return os.path.join(cache_dir, f"{content_hash}.v{PARSER_VERSION}.npz")
+
+# Function to load a track log through the binary cache
+# A hit only reads the .npz (milliseconds instead of parsing the XML); a miss parses the KML and stores the
+# decoded track. The file's modification time marks its last use, so eviction drops the least recently used
+def load_track(input_kml_file, content_hash=None, cache_dir=None, max_bytes=TRACK_CACHE_MAX_BYTES):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(input_kml_file)), TRACK_CACHE_DIR)
+    content_hash = content_hash or file_sha256(input_kml_file)
+    cache_file = track_cache_path(cache_dir, content_hash)
+    try:
+        os.utime(cache_file)
+        with profiling.stage('read_track_cache'):
+            track = Track.load_npz(cache_file)
+        profiling.count('track_cache_hits')
+        return track
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass  # Not cached yet (or a damaged file, which is replaced below)
+
+    profiling.count('track_cache_misses')
+    with profiling.stage('parse_kml') as stage:
+        track = Track.from_kml(input_kml_file)
+        stage.points = len(track)
+    try:
+        with profiling.stage('write_track_cache'):
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'wb') as file:
+                track.save_npz(file)
+            os.replace(temp_file, cache_file)  # Atomic, so concurrent workers never load a half-written track
+            evict_tracks(cache_dir, max_bytes)
+    except OSError:
+        pass  # A read-only directory only means the track is not cached
+    return track
+
+# Function to load only a track log's timestamps through the binary cache
+# A hit reads just that array from the .npz; a miss goes through load_track, so the track is parsed and cached
+# once and everything but its timestamps is released straight away
+def load_track_timestamps(input_kml_file, content_hash=None, cache_dir=None, max_bytes=TRACK_CACHE_MAX_BYTES):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(input_kml_file)), TRACK_CACHE_DIR)
+    content_hash = content_hash or file_sha256(input_kml_file)
+    try:
+        with np.load(track_cache_path(cache_dir, content_hash), allow_pickle=False) as data:
+            return data['timestamps_ns']
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return load_track(input_kml_file, content_hash, cache_dir, max_bytes).timestamps_ns
+
+# Function to delete the least recently used cached tracks until the cache fits in max_bytes
+# Returns the number of files removed
+def evict_tracks(cache_dir, max_bytes=TRACK_CACHE_MAX_BYTES):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.npz'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+    return removed
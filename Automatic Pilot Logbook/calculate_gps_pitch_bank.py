@@ -1,59 +1,28 @@
-import csv
-import math
+import pandas as pd
 
-def haversine(lon1, lat1, lon2, lat2):
-    # Convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    r = 6371  # Radius of Earth in kilometers
-    return c * r * 1000  # Return distance in meters
-
-def calculate_bearing(lon1, lat1, lon2, lat2):
-    # Convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    x = math.sin(dlon) * math.cos(lat2)
-    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-    initial_bearing = math.atan2(x, y)
-    # Convert bearing from radians to degrees
-    initial_bearing = math.degrees(initial_bearing)
-    compass_bearing = (initial_bearing + 360) % 360  # Normalize to 0-360 degrees
-    return compass_bearing
+# Shared vectorized geodesy helpers live with the final code; run with PYTHONPATH="Final Code" (see README)
+from geodesy import ground_speed_course, METERS_TO_FEET
+from track import parse_timestamps
 
 def calculate_speed_altitude_course(input_csv, output_csv):
-    with open(input_csv, 'r') as infile, open(output_csv, 'w', newline='') as outfile:
-        reader = csv.DictReader(infile)
-        fieldnames = ['Timestamp', 'Speed (knots)', 'Altitude (feet)', 'Course (degrees)', 'Latitude', 'Longitude', 'Source', 'GPSModelName', 'FlightTitle']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        previous_row = None
-        for row in reader:
-            if previous_row:
-                lon1, lat1, alt1 = float(previous_row['Longitude']), float(previous_row['Latitude']), float(previous_row['Altitude'])
-                lon2, lat2, alt2 = float(row['Longitude']), float(row['Latitude']), float(row['Altitude'])
-                distance = haversine(lon1, lat1, lon2, lat2)
-                speed_mps = distance  # Speed in meters per second (since data is logged every second)
-                speed_knots = speed_mps * 1.94384  # Convert speed to knots
-                altitude_feet = alt2 * 3.28084  # Convert altitude to feet
-                course = calculate_bearing(lon1, lat1, lon2, lat2)  # Calculate course
-                writer.writerow({
-                    'Timestamp': row['Timestamp'], 
-                    'Speed (knots)': f"{speed_knots:.2f}", 
-                    'Altitude (feet)': f"{altitude_feet:.2f}", 
-                    'Course (degrees)': f"{course:.2f}", 
-                    'Latitude': row['Latitude'],
-                    'Longitude': row['Longitude'],
-                    'Source': row['Source'],
-                    'GPSModelName': row['GPSModelName'],
-                    'FlightTitle': row['FlightTitle']
-                })
-            previous_row = row
+    df = pd.read_csv(input_csv)
+    timestamps_ns = parse_timestamps(df['Timestamp'])
 
+    # Speed and course for the whole track at once, using the real time between samples
+    speed_knots, course = ground_speed_course(timestamps_ns, df['Latitude'].to_numpy(), df['Longitude'].to_numpy())
+    cleaned = pd.DataFrame({
+        'Timestamp': df['Timestamp'],
+        'Speed (knots)': speed_knots,
+        'Altitude (feet)': df['Altitude'].to_numpy() * METERS_TO_FEET,  # Convert altitude to feet
+        'Course (degrees)': course,
+        'Latitude': df['Latitude'],
+        'Longitude': df['Longitude'],
+        'Source': df['Source'],
+        'GPSModelName': df['GPSModelName'],
+        'FlightTitle': df['FlightTitle']
+    })
+    # The first sample has no previous point to measure from
+    cleaned.iloc[1:].to_csv(output_csv, index=False, float_format='%.2f')
 
 output_csv = 'TrackLog_E54708BF-CEEB-412E-B04F-CDF3C14E8D6D-2024.10.15.kml'
 calculate_speed_altitude_course('output.csv', 'output_from_gps_pitch_bank.csv')
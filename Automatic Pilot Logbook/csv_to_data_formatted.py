@@ -1,21 +1,18 @@
 import folium
+import numpy as np
 import pandas as pd
 import csv
-from math import radians, cos, sin, sqrt, atan2
 from datetime import datetime, timedelta
 from astral.sun import sun
 from astral import LocationInfo
 import pytz
 
+# Shared vectorized geodesy helpers live with the final code; run with PYTHONPATH="Final Code" (see README)
+from geodesy import haversine_km
+
 # Function to calculate the distance between two points using the Haversine formula
 def haversine_final(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius of the Earth in kilometers
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    distance = R * c
-    return distance
+    return haversine_km(lat1, lon1, lat2, lon2)  # Distance in kilometers
 
 # Function to determine if a timestamp is during night time (between sunset and sunrise without the ±1-hour buffer)
 def is_night_flight(timestamp, latitude, longitude):
@@ -250,19 +247,21 @@ def create_flight_path_map(
     night_cross_country_all = False
     night_cross_country_50_nm = False
 
+    # Distance from every track point to every airport in one array operation
+    airport_lats = np.array([airport['Latitude'] for airport in airport_coords])
+    airport_lons = np.array([airport['Longitude'] for airport in airport_coords])
+    distances = haversine_final(df['Latitude'].to_numpy()[:, None], df['Longitude'].to_numpy()[:, None], airport_lats[None, :], airport_lons[None, :])
+    closest_indexes = distances.argmin(axis=1)
+    min_distances = distances[np.arange(len(df)), closest_indexes]
+
     # Iterate through each data point in the flight path
     for i, (lat, lon, speed, altitude, timestamp) in enumerate(zip(df['Latitude'], df['Longitude'], df['Speed (knots)'], df['Altitude (feet)'], df['Timestamp'])):
         current_time = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%fZ')
         speed_flag = speed > 45  # Track if speed was above 45 knots previously
 
         # Find the closest airport
-        closest_airport = None
-        min_distance = float('inf')
-        for airport in airport_coords:
-            distance = haversine_final(lat, lon, airport['Latitude'], airport['Longitude'])
-            if distance < min_distance:
-                min_distance = distance
-                closest_airport = airport
+        closest_airport = airport_coords[closest_indexes[i]]
+        min_distance = min_distances[i]
 
         # Check if the closest airport is within the landing threshold
         if min_distance <= 2 and speed < 50 and speed_flag and altitude < (closest_airport['Elevation'] + 100):
@@ -1,21 +1,19 @@
 import folium
 import pandas as pd
 import csv
-from math import radians, cos, sin, sqrt, atan2, degrees
 from datetime import datetime, timedelta
 from astral.sun import sun
 from astral import LocationInfo
 import pytz
 
+# Shared vectorized geodesy helpers live with the final code; run with PYTHONPATH="Final Code" (see README)
+from geodesy import haversine_km, bearing_deg, METERS_TO_FEET
+from track import Track, parse_timestamps
+from maneuvers import find_steep_turns
+
 # Function to calculate the distance between two points using the Haversine formula
 def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius of the Earth in kilometers
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    distance = R * c
-    return distance
+    return haversine_km(lat1, lon1, lat2, lon2)  # Distance in kilometers
 
 # Function to determine if a landing is during the day or night
 def is_night_landing(timestamp, latitude, longitude):
@@ -30,15 +28,7 @@ def is_night_landing(timestamp, latitude, longitude):
 
 # Function to calculate the bearing between two points
 def calculate_bearing(lat1, lon1, lat2, lon2):
-    dLon = radians(lon2 - lon1)
-    lat1 = radians(lat1)
-    lat2 = radians(lat2)
-    x = sin(dLon) * cos(lat2)
-    y = cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dLon)
-    bearing = atan2(x, y)
-    bearing = degrees(bearing)
-    bearing = (bearing + 360) % 360
-    return bearing
+    return bearing_deg(lat1, lon1, lat2, lon2)
 
 # # Function to detect steep turn
 # def detect_steep_turn(df, index, radius_km=0.25):
@@ -56,73 +46,12 @@ def calculate_bearing(lat1, lon1, lat2, lon2):
 #             return True, i
 #     return False, len(df)
 
-# Function to detect and count steep turns
-def detect_steep_turns(df, radius_km=0.25, stationary_threshold_km=0.1):
-    steep_turn_count = 0
-    
-    for i in range(len(df) - 100):  # Use each point as a potential start of a circular path
-        start_lat = df['Latitude'][i]
-        start_lon = df['Longitude'][i]
-        completed_circle = False
-        max_distance = 0
-        is_stationary = True
-        
-        # Check if the segment of points is stationary
-        for j in range(i + 1, i + 100):
-            next_lat = df['Latitude'][j]
-            next_lon = df['Longitude'][j]
-            if haversine(start_lat, start_lon, next_lat, next_lon) > stationary_threshold_km:
-                is_stationary = False
-                break
-
-        # Skip this segment if it's stationary
-        if is_stationary:
-            continue
-
-        # Check the next 50 points to see if they form a circle
-        for j in range(i + 10, i + 50):
-            current_lat = df['Latitude'][j]
-            current_lon = df['Longitude'][j]
-            
-            # Check if we return to the starting point
-            if haversine(start_lat, start_lon, current_lat, current_lon) < 0.05:  # Small threshold to detect closure
-                completed_circle = True
-                path_segment = df.iloc[i:j+1]
-                break
-
-        if not completed_circle:
-            continue
-
-        # Calculate center of path segment
-        center_lat = path_segment['Latitude'].mean()
-        center_lon = path_segment['Longitude'].mean()
-
-        # Check circularity by verifying that all points are within similar distance from the center
-        distances_to_center = [
-            haversine(center_lat, center_lon, row['Latitude'], row['Longitude'])
-            for _, row in path_segment.iterrows()
-        ]
-
-        # Calculate average distance and ensure deviations are minimal
-        avg_distance = sum(distances_to_center) / len(distances_to_center)
-        max_deviation = max(abs(d - avg_distance) for d in distances_to_center)
-
-        # Check that the path is circular: small deviation from average radius and consistent angular change
-        if max_deviation < radius_km * 0.1:  # Allow up to 10% deviation in radius
-            angles = []
-            for k in range(1, len(path_segment)):
-                lat1, lon1 = path_segment.iloc[k-1][['Latitude', 'Longitude']]
-                lat2, lon2 = path_segment.iloc[k][['Latitude', 'Longitude']]
-                angle = atan2(lon2 - center_lon, lat2 - center_lat) - atan2(lon1 - center_lon, lat1 - center_lat)
-                angle = degrees(angle)
-                angles.append(angle if angle >= 0 else angle + 360)
-
-            # Smooth progression of angles indicates circular path
-            if all(angles[k] > angles[k-1] for k in range(1, len(angles))) or all(angles[k] < angles[k-1] for k in range(1, len(angles))):
-                steep_turn_count += 1
-                i += 100  # Skip ahead to avoid recounting the same maneuver
-    
-    return steep_turn_count
+# Function to detect and count steep turns by the same rules as the final code (maneuvers.find_steep_turns):
+# 345+ degree turns completed in 15-30 seconds, from the recorded course and speed
+def detect_steep_turns(df):
+    channels = {'speed_kts': df['Speed (knots)'].to_numpy(dtype=float), 'course': df['Course (degrees)'].to_numpy(dtype=float)}
+    track = Track(parse_timestamps(df['Timestamp']), df['Latitude'], df['Longitude'], df['Altitude (feet)'].to_numpy(dtype=float) / METERS_TO_FEET, channels)
+    return len(find_steep_turns(track))
 
 
 
@@ -153,8 +82,10 @@ def create_flight_path_map(csv_file, airport_coords, output_html, landings_csv,
     for airport in airport_coords:
         folium.Marker(location=(airport['Latitude'], airport['Longitude']), icon=folium.Icon(color='red', icon='plane')).add_to(flight_map)
         speed_flag = False  # Initialize the speed flag
+        # Distance from every track point to this airport in one array operation
+        distances = haversine(df['Latitude'].to_numpy(), df['Longitude'].to_numpy(), airport['Latitude'], airport['Longitude'])
         for i, (lat, lon, speed, altitude, timestamp) in enumerate(zip(df['Latitude'], df['Longitude'], df['Speed (knots)'], df['Altitude (feet)'], df['Timestamp'])):
-            distance = haversine(lat, lon, airport['Latitude'], airport['Longitude'])
+            distance = distances[i]
             if speed > 45 and speed_flag == False:
                 speed_flag = True  # Set the flag to true when speed is above 30 knots
             if distance <= buffer_radius_km and speed < 30 and speed_flag and altitude < (airport['Elevation'] + 100):